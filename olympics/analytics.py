@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+
+from .models import Athlete, Country, Discipline, Event, Medal
+from .versions import aget_stamp, get_stamp
+
+# Every table the snapshot is built from; a change to any of them reloads it
+SNAPSHOT_MODELS = (Athlete, Event, Medal, Country, Discipline)
+
+# Table -> (queryset, [(column, field, dtype), ...]). Rows are read in the order the
+# dashboard lists them, so the first rows of a frame are the page's "top" rows.
+SOURCES = {
+    'athletes': (lambda: Athlete.objects.order_by('name', 'id'), [
+        ('id', 'id', 'int32'),
+        ('name', 'name', None),
+        ('country', 'noc__name', 'category'),
+        ('sport', 'sport', 'category'),
+        ('height', 'height', 'float32'),
+        ('weight', 'weight', 'float32'),
+        ('birth_date', 'birth_date', 'datetime64[s]'),
+    ]),
+    'athlete_disciplines': (lambda: Athlete.disciplines.through.objects.order_by('athlete_id', 'discipline_id'), [
+        ('athlete_id', 'athlete_id', 'int32'),
+        ('discipline', 'discipline__name', 'category'),
+    ]),
+    'events': (lambda: Event.objects.order_by('sport', 'name', 'id'), [
+        ('id', 'id', 'int32'),
+        ('name', 'name', None),
+        ('sport', 'sport', 'category'),
+        ('sport_code', 'sport_code', 'category'),
+    ]),
+    'medals': (lambda: Medal.objects.order_by('id'), [
+        ('id', 'id', 'int32'),
+        ('medal_type', 'medal_type', 'category'),
+        ('medal_code', 'medal_code', 'int8'),
+        ('medal_date', 'medal_date', 'datetime64[s]'),
+        ('country', 'noc__name', 'category'),
+        ('discipline', 'discipline', 'category'),
+        ('athlete_id', 'athlete_id', 'int32'),
+        ('event_id', 'event_id', 'int32'),
+    ]),
+}
+
+# Stand-ins for NULL in the integer columns, which NumPy cannot hold missing values in
+MISSING_INT = {'int8': 0, 'int32': -1}
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _frame(queryset, columns):
+    frame = pd.DataFrame.from_records(
+        list(queryset.values_list(*[field for _, field, _ in columns])),
+        columns=[column for column, _, _ in columns],
+    )
+    for column, _, dtype in columns:
+        if dtype in MISSING_INT:
+            frame[column] = frame[column].fillna(MISSING_INT[dtype])
+        if dtype:
+            frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+class Snapshot:
+    """Columnar, read-only copy of the dashboard tables at one data version.
+
+    Repeated strings (countries, sports, medal types) are categoricals, so a
+    group-by is a bincount over small integer codes instead of a SQL GROUP BY.
+    """
+
+    def __init__(self, version, frames):
+        self.version = version
+        self.frames = frames
+
+    @classmethod
+    def load(cls, version):
+        return cls(version, {
+            table: _frame(queryset(), columns) for table, (queryset, columns) in SOURCES.items()
+        })
+
+    def totals(self):
+        return {table: len(self.frames[table]) for table in ('athletes', 'events', 'medals')}
+
+    def head(self, table, columns, limit):
+        """The first `limit` rows of `table` in display order, as dicts of `columns`."""
+        # Slicing the column arrays skips DataFrame.head(), which costs more than the rows here
+        frame = self.frames[table]
+        return [dict(zip(columns, row)) for row in zip(*(frame[column].array[:limit].tolist() for column in columns))]
+
+    def mask(self, table, **filters):
+        """Boolean array of the rows of `table` whose columns equal every value in `filters`."""
+        frame = self.frames[table]
+        mask = np.ones(len(frame), dtype=bool)
+        for column, value in filters.items():
+            series = frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Compare integer codes; a value the snapshot has never seen matches nothing
+                code = series.cat.categories.get_indexer([value])[0]
+                mask &= (series.cat.codes.to_numpy() == code) & (code >= 0)
+            else:
+                mask &= series.to_numpy() == value
+        return mask
+
+    def count_by(self, table, column, limit=None, **filters):
+        """[(value, count), ...] of the categorical `column` of `table`, largest first, ties by value."""
+        series = self.frames[table][column]
+        codes = series.cat.codes.to_numpy()
+        if filters:
+            codes = codes[self.mask(table, **filters)]
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        # Categories are sorted, so their position breaks ties alphabetically
+        order = np.lexsort((np.arange(len(counts)), -counts))
+        order = order[counts[order] > 0][:limit]
+        categories = series.cat.categories
+        return [(categories[i], int(counts[i])) for i in order]
+
+    def memory_usage(self):
+        """[{'table', 'column', 'dtype', 'bytes', 'object_bytes'}], `object_bytes` being the same column as Python objects."""
+        rows = []
+        for table, frame in self.frames.items():
+            compact = frame.memory_usage(index=False, deep=True)
+            plain = frame.astype(object).memory_usage(index=False, deep=True)
+            rows.extend(
+                {'table': table, 'column': column, 'dtype': str(frame[column].dtype),
+                 'bytes': int(compact[column]), 'object_bytes': int(plain[column])}
+                for column in frame.columns
+            )
+        return rows
+
+
+def get_snapshot(stamp=None):
+    """The snapshot at the current data version, loaded by the first caller after a change."""
+    global _snapshot
+    stamp = stamp or get_stamp(*SNAPSHOT_MODELS)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == stamp.key:
+        return snapshot
+    with _lock:
+        # Threads that waited here find the snapshot another one just loaded
+        if _snapshot is None or _snapshot.version != stamp.key:
+            _snapshot = Snapshot.load(stamp.key)
+        return _snapshot
+
+
+async def aget_snapshot():
+    # Only a reload needs the sync thread; the version check is one async query
+    stamp = await aget_stamp(*SNAPSHOT_MODELS)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == stamp.key:
+        return snapshot
+    return await sync_to_async(get_snapshot)(stamp)
+
+
+def clear():
+    # Forget this process's snapshot, e.g. between tests that reuse data versions
+    global _snapshot
+    with _lock:
+        _snapshot = None
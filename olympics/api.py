@@ -0,0 +1,156 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from .facets import aget_facets
+from .filters import AthleteFilter, EventFilter, MedalFilter
+from .pagination import apaginate
+from .versions import aget_stamp
+
+# Resource -> (filter spec, {public field name: ORM lookup})
+RESOURCES = {
+    'athletes': (AthleteFilter, {
+        'id': 'id',
+        'name': 'name',
+        'country': 'country',
+        'country_code': 'noc__code',
+        'sport': 'sport',
+        'birth_date': 'birth_date',
+        'birth_place': 'birth_place',
+        'height': 'height',
+        'weight': 'weight',
+        'coach': 'coach',
+    }),
+    'events': (EventFilter, {
+        'id': 'id',
+        'name': 'name',
+        'sport': 'sport',
+        'sport_code': 'sport_code',
+    }),
+    'medals': (MedalFilter, {
+        'id': 'id',
+        'medal_type': 'medal_type',
+        'medal_code': 'medal_code',
+        'medal_date': 'medal_date',
+        'discipline': 'discipline',
+        'country': 'country',
+        'country_code': 'noc__code',
+        'athlete_id': 'athlete_id',
+        'athlete_name': 'athlete__name',
+        'event_id': 'event_id',
+        'event_name': 'event__name',
+    }),
+}
+
+
+def _unauthorized():
+    return JsonResponse({'error': 'Authentication required.'}, status=401)
+
+
+def api_login_required(view):
+    # Like login_required, but answers API clients with a 401 instead of a redirect
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not (await request.auser()).is_authenticated:
+                return _unauthorized()
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _unauthorized()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def selected_fields(request, available):
+    """The fields named in ?fields=a,b (all of them by default); `id` is always included."""
+    requested = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+    if not requested:
+        return list(available)
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return ['id'] + [name for name in requested if name != 'id']
+
+
+async def resource_list(request, resource):
+    filter_class, available = RESOURCES[resource]
+    spec = filter_class.from_params(request.GET)
+    try:
+        fields = selected_fields(request, available)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    # The data can only change when one of its tables' version counters moves
+    stamp = await aget_stamp(*spec.depends_on)
+    etag = '"%s"' % hashlib.sha1(f"{resource}:{stamp.key}:{request.GET.urlencode()}".encode()).hexdigest()
+    last_modified = int(stamp.last_modified.timestamp()) if stamp.last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        # Serialize straight from values(), only touching the requested columns
+        queryset = spec.queryset().values(*[available[name] for name in fields])
+        page = await apaginate(request, queryset, spec)
+        response = JsonResponse({
+            'count': page.total_count,
+            'next': request.build_absolute_uri(page.next_url()) if page.has_next else None,
+            'previous': request.build_absolute_uri(page.previous_url()) if page.has_previous else None,
+            'results': [{name: row[available[name]] for name in fields} for row in page],
+        })
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def resource_facets(request, resource):
+    # Values of each facet field with their counts under the other filters in the query string
+    filter_class, _ = RESOURCES[resource]
+    spec = filter_class.from_params(request.GET)
+    return JsonResponse({'filters': spec.params(), 'facets': await aget_facets(spec)})
+
+
+@require_GET
+@api_login_required
+async def athletes_api(request):
+    return await resource_list(request, 'athletes')
+
+
+@require_GET
+@api_login_required
+async def events_api(request):
+    return await resource_list(request, 'events')
+
+
+@require_GET
+@api_login_required
+async def medals_api(request):
+    return await resource_list(request, 'medals')
+
+
+@require_GET
+@api_login_required
+async def athletes_facets_api(request):
+    return await resource_facets(request, 'athletes')
+
+
+@require_GET
+@api_login_required
+async def events_facets_api(request):
+    return await resource_facets(request, 'events')
+
+
+@require_GET
+@api_login_required
+async def medals_facets_api(request):
+    return await resource_facets(request, 'medals')
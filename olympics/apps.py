@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class OlympicsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'olympics'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .perf import install_query_hook
+        from .search import restore_triggers
+
+        post_migrate.connect(restore_triggers, sender=self)
+        connection_created.connect(install_query_hook)
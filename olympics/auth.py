@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Seconds a user is served from the cache before it is read from the database again
+AUTH_USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def forget_user(user_id):
+    # Called when a user is saved or deleted, so logins see the change on their next request
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is served from the cache.
+
+    AuthenticationMiddleware loads the logged-in user by id on every
+    request (request.user and request.auser() both go through get_user).
+    Saving or deleting a user drops its entry; with a per-process cache,
+    other processes can keep the old row for up to AUTH_USER_CACHE_TIMEOUT.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,294 @@
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+
+import matplotlib
+import matplotlib.dates as mdates
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from matplotlib.figure import Figure
+
+from . import analytics, physique, timeline
+from .models import Athlete, Country, Event, Medal
+from .versions import aget_stamp, get_stamp
+
+CHART_CACHE_DIR = getattr(settings, 'CHART_CACHE_DIR', None)
+
+# Threads drawing charts for async views (matplotlib is CPU-bound and would block the event loop)
+CHART_RENDER_WORKERS = getattr(settings, 'CHART_RENDER_WORKERS', 2)
+
+_executor = None
+
+
+def _unzip(pairs):
+    return [key for key, _ in pairs], [count for _, count in pairs]
+
+
+# Each chart is drawn on its own Figure, never through the pyplot state
+# machine, so concurrent requests in a threaded server cannot interfere.
+
+def _bar_chart(fig, labels, counts, xlabel, ylabel, title):
+    ax = fig.add_subplot()
+    ax.bar(labels, counts, color='gold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+
+def athletes_top_countries(fig, ranking):
+    # The top 10 countries by the number of athletes
+    countries, counts = _unzip(ranking)
+    _bar_chart(fig, countries, counts, 'Country', 'Number of Athletes', 'Top 10 Countries by Number of Athletes')
+
+
+def athletes_by_country(fig, ranking):
+    countries, counts = _unzip(ranking)
+    _bar_chart(fig, countries, counts, 'Country', 'Number of Athletes', 'Number of Athletes by Country')
+
+
+def events_by_sport(fig, ranking):
+    # The top 10 sports by the number of events
+    sports, counts = _unzip(ranking)
+
+    ax = fig.add_subplot()
+    wedges, _, _ = ax.pie(
+        counts,
+        labels=None,  # Don't label the pie directly
+        autopct='%1.1f%%',
+        startangle=140,
+        colors=matplotlib.colormaps['tab20'].colors[:len(counts)],  # Use consistent color palette
+    )
+    # Add legend on the top right
+    ax.legend(wedges, sports, title="Sports", loc="upper right", bbox_to_anchor=(1.3, 1), frameon=False)
+    ax.set_title('Percentage of Events by Sport (Top 10)')
+
+
+def medals_by_country(fig, ranking):
+    countries, counts = _unzip(ranking)
+    _bar_chart(fig, countries, counts, 'Country', 'Number of Medals', 'Number of Medals by Country')
+
+
+def physique_histograms(fig, summary):
+    # Height, weight and BMI side by side, each with its median marked
+    for position, (metric, xlabel) in enumerate([('height', 'Height (cm)'), ('weight', 'Weight (kg)'), ('bmi', 'BMI')], 1):
+        ax = fig.add_subplot(1, 3, position)
+        distribution = summary[metric]
+        bins = distribution['histogram']['bins']
+        if distribution['count']:
+            ax.stairs(distribution['histogram']['counts'], bins, fill=True, color='gold')
+            ax.axvline(distribution['percentiles']['p50'], color='black', linestyle='--', linewidth=1)
+        ax.set_xlim(bins[0], bins[-1])
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('Number of Athletes')
+        ax.set_title(f"{distribution['count']} of {summary['athletes']} athletes")
+    fig.suptitle(f"Physique of {summary['sport'] or 'All'} Athletes")
+
+
+TIMELINE_COLUMNS = 5
+
+
+def medal_timeline(fig, data):
+    # One small panel per country on a shared scale, so the races compare at a glance
+    countries = data['countries']
+    days = [date.fromisoformat(day) for day in data['days']]
+    rows = max(1, -(-len(countries) // TIMELINE_COLUMNS))
+    axes = list(fig.subplots(rows, TIMELINE_COLUMNS, sharex=True, sharey=True, squeeze=False).flat)
+    for ax, country in zip(axes, countries):
+        ax.step(days, country['cumulative'], where='post', color='goldenrod')
+        ax.fill_between(days, country['cumulative'], step='post', color='gold', alpha=0.5)
+        ax.set_title(f"{country['country']} ({country['cumulative'][-1]})", fontsize=10)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
+        ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+    for ax in axes[len(countries):]:
+        # Panels left over in the last row
+        ax.set_visible(False)
+    fig.suptitle(f"Cumulative Medals per Day (Top {len(countries)} Countries)")
+
+
+# Chart name -> (draw function, the data it draws, tables the data is computed from)
+CHARTS = {
+    'athletes_top_countries': (
+        athletes_top_countries, lambda: analytics.get_snapshot().count_by('athletes', 'country', 10), (Athlete, Country),
+    ),
+    'athletes_by_country': (
+        athletes_by_country, lambda: analytics.get_snapshot().count_by('athletes', 'country'), (Athlete, Country),
+    ),
+    'events_by_sport': (
+        events_by_sport, lambda: analytics.get_snapshot().count_by('events', 'sport', 10), (Event,),
+    ),
+    'medals_by_country': (
+        medals_by_country, lambda: analytics.get_snapshot().count_by('medals', 'country'), (Medal, Country),
+    ),
+}
+
+
+def _png(fig):
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def chart_data(name):
+    _, data, _ = CHARTS[name]
+    return data()
+
+
+def render_chart(name, data):
+    draw, _, _ = CHARTS[name]
+    fig = Figure(figsize=(10, 6))
+    draw(fig, data)
+    return _png(fig)
+
+
+def chart_stamp(name):
+    _, _, models = CHARTS[name]
+    return get_stamp(*models)
+
+
+def chart_key(name, stamp):
+    # The same chart over the same data always maps to the same key
+    return f"{name}-{stamp.key}"
+
+
+def chart_path(name, data):
+    # Named after what is drawn rather than the data version, whose counters start over with a new database
+    digest = hashlib.sha1(json.dumps(data, default=str).encode()).hexdigest()
+    return os.path.join(CHART_CACHE_DIR, f"{name}-{digest}.png")
+
+
+def write_chart(name, data, png):
+    os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+    path = chart_path(name, data)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(png)
+    os.replace(tmp_path, path)
+
+    # Renders of older data are not served again
+    for old_path in glob.glob(os.path.join(glob.escape(CHART_CACHE_DIR), f"{glob.escape(name)}-*.png")):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                # Another worker pruned it first
+                pass
+    return path
+
+
+def get_chart(name, stamp):
+    """Return the PNG for `name`, from the cache, the warm-up folder or a fresh render."""
+    cache_key = f"chart:{chart_key(name, stamp)}"
+    png = cache.get(cache_key)
+    if png is not None:
+        return png
+
+    data = chart_data(name)
+    if CHART_CACHE_DIR and os.path.exists(chart_path(name, data)):
+        with open(chart_path(name, data), 'rb') as f:
+            png = f.read()
+    else:
+        png = render_chart(name, data)
+        if CHART_CACHE_DIR:
+            write_chart(name, data, png)
+
+    cache.set(cache_key, png)
+    return png
+
+
+def _validators(name, stamp):
+    etag = '"%s"' % hashlib.sha1(chart_key(name, stamp).encode()).hexdigest()
+    last_modified = int(stamp.last_modified.timestamp()) if stamp.last_modified else None
+    return etag, last_modified
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=CHART_RENDER_WORKERS, thread_name_prefix='chart')
+    return _executor
+
+
+async def _achart(request, name, stamp, load):
+    etag, last_modified = _validators(name, stamp)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        png = await cache.aget(f"chart:{chart_key(name, stamp)}")
+        if png is None:
+            # Reading the disk copy or drawing with matplotlib would block every other request
+            png = await asyncio.get_running_loop().run_in_executor(get_executor(), load)
+        response = HttpResponse(png, content_type='image/png')
+    return _with_validators(response, etag, last_modified)
+
+
+async def achart_response(request, name):
+    """The PNG of chart `name` with ETag/Last-Modified, or a 304 while the browser's copy is current.
+
+    Cache misses are read from disk or drawn in a thread pool, off the event loop.
+    """
+    _, _, models = CHARTS[name]
+    stamp = await aget_stamp(*models)
+    return await _achart(request, name, stamp, partial(get_chart, name, stamp))
+
+
+def physique_chart_name(sport):
+    return f"physique-{physique.sport_digest(sport)}"
+
+
+def _get_data_chart(name, stamp, draw, data, figsize):
+    # Charts drawn from cached data rather than listed in CHARTS; cached in the same keyspace
+    cache_key = f"chart:{chart_key(name, stamp)}"
+    png = cache.get(cache_key)
+    if png is None:
+        fig = Figure(figsize=figsize)
+        draw(fig, data())
+        png = _png(fig)
+        cache.set(cache_key, png)
+    return png
+
+
+def get_physique_chart(sport, stamp):
+    """PNG of the height, weight and BMI histograms of `sport`, cached until an athlete or discipline changes."""
+    return _get_data_chart(
+        physique_chart_name(sport), stamp, physique_histograms, lambda: physique.get_physique(sport, stamp), (15, 5)
+    )
+
+
+async def aphysique_chart_response(request, sport):
+    stamp = await aget_stamp(*physique.PHYSIQUE_MODELS)
+    return await _achart(request, physique_chart_name(sport), stamp, partial(get_physique_chart, sport, stamp))
+
+
+def get_timeline_chart(top, stamp):
+    """PNG of the top countries' cumulative medals per day, cached until a medal or country changes."""
+    rows = max(1, -(-top // TIMELINE_COLUMNS))
+    return _get_data_chart(
+        f"medal-timeline-{top}", stamp, medal_timeline, lambda: timeline.get_timeline(top, stamp),
+        (15, 3 * rows + 1),
+    )
+
+
+async def atimeline_chart_response(request, top):
+    stamp = await aget_stamp(*timeline.TIMELINE_MODELS)
+    return await _achart(request, f"medal-timeline-{top}", stamp, partial(get_timeline_chart, top, stamp))
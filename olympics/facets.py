@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .filters import FILTERS
+from .versions import get_stamp
+
+# Facet results kept in this process in front of the shared cache
+FACET_LRU_SIZE = getattr(settings, 'FACET_LRU_SIZE', 256)
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached(key, compute):
+    # Process-local LRU first, then the cache framework, then the database
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            return _lru[key]
+    value = cache.get_or_set(key, compute)
+    with _lock:
+        _lru[key] = value
+        _lru.move_to_end(key)
+        while len(_lru) > FACET_LRU_SIZE:
+            _lru.popitem(last=False)
+    return value
+
+
+def _prefix(spec, field):
+    return f"facet:{spec.model._meta.label_lower}:{field}"
+
+
+def facet_counts(spec, field, stamp=None):
+    """[{'value', 'label', 'count'}] for `field` among the rows matching every filter of `spec` but its own."""
+    # Leaving the facet's own filter out keeps its other values (and their counts) selectable
+    spec = replace(spec, **{field: ''})
+    lookup = spec.facet_lookups.get(field, field)
+    label = spec.facet_labels.get(field, lookup)
+
+    def compute():
+        rows = spec.queryset().order_by().values(lookup, label).annotate(count=Count('id'))
+        return sorted(
+            ({'value': row[lookup], 'label': row[label], 'count': row['count']} for row in rows if row[lookup]),
+            key=lambda item: item['label'],
+        )
+
+    return _cached(spec.cache_key(_prefix(spec, field), stamp), compute)
+
+
+def get_facets(spec):
+    """Every facet of `spec`: all values of each field, counted under the current filters.
+
+    Values with no matching rows stay in the list with a count of 0.
+    """
+    unfiltered = type(spec)()
+    # One data version lookup for every facet of the page
+    stamp = get_stamp(*spec.depends_on)
+    facets = {}
+    for field in spec.facet_fields:
+        counts = {item['value']: item['count'] for item in facet_counts(spec, field, stamp)}
+        facets[field] = [
+            {'value': item['value'], 'label': item['label'], 'count': counts.get(item['value'], 0)}
+            for item in facet_counts(unfiltered, field, stamp)
+        ]
+    return facets
+
+
+async def aget_facets(spec):
+    # Nearly always an LRU or cache hit; a miss runs its grouped counts in the sync thread
+    return await sync_to_async(get_facets)(spec)
+
+
+def invalidate(model):
+    # Drop this process's facets over `model`; other processes miss on the new data version instead
+    prefixes = tuple(
+        _prefix(spec_class, field)
+        for spec_class in FILTERS.values() if model in spec_class.depends_on
+        for field in spec_class.facet_fields
+    )
+    with _lock:
+        for key in [key for key in _lru if key.startswith(prefixes)]:
+            del _lru[key]
+
+
+def clear():
+    # Empty this process's LRU, e.g. between tests that reuse data versions
+    with _lock:
+        _lru.clear()
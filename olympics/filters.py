@@ -0,0 +1,161 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, fields
+from typing import ClassVar
+
+from django.db.models import F, Q
+
+from .models import Athlete, Country, Discipline, Event, Medal
+from .search import search_athletes
+from .versions import aget_stamp, get_stamp
+
+
+@dataclass(frozen=True)
+class FilterSpec(ABC):
+    """The filters of one list/export request, normalized and hashable.
+
+    Built once from the query string and shared by the list page, its
+    CSV/PDF exports and the API, so all of them run the same query. The
+    digest identifies the filter set in cache keys.
+    """
+
+    model: ClassVar = None
+    # Tables the filtered rows (and their exported columns) are read from
+    depends_on: ClassVar = ()
+    # Filters offered as a fixed list of values, shown with per-value counts
+    facet_fields: ClassVar = ()
+    # Lookup a facet's values are grouped on, where it is not the field itself
+    facet_lookups: ClassVar = {}
+    # Lookup of the text shown for each facet value, where it is not the value
+    facet_labels: ClassVar = {}
+
+    @classmethod
+    def from_params(cls, params):
+        # Whitespace-only or repeated spaces never make a different filter
+        return cls(**{
+            field.name: ' '.join((params.get(field.name) or '').split())
+            for field in fields(cls)
+        })
+
+    def params(self):
+        """The non-empty filters, for query strings and stored jobs."""
+        return {name: value for name, value in asdict(self).items() if value}
+
+    @property
+    def digest(self):
+        payload = json.dumps([self.model._meta.label_lower, sorted(self.params().items())])
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def cache_key(self, prefix, stamp=None):
+        # Changes with the filters and with every write to the tables behind them
+        stamp = stamp or get_stamp(*self.depends_on)
+        return f"{prefix}:{self.digest}:{stamp.key}"
+
+    async def acache_key(self, prefix):
+        return f"{prefix}:{self.digest}:{(await aget_stamp(*self.depends_on)).key}"
+
+    @abstractmethod
+    def filter(self, queryset):
+        """`queryset` narrowed to the rows these filters match."""
+
+    def queryset(self):
+        return self.filter(self.model.objects.all())
+
+    def rows(self, *lookups):
+        # Tuples of just the exported columns, in primary key order
+        return self.queryset().order_by('id').values_list(*lookups)
+
+    async def arows(self, *lookups, chunk_size=2000):
+        """rows() as an async iterator, fetching `chunk_size` rows per round trip."""
+        # values_list().aiterator() starts its query on the event loop thread in Django 5.1
+        # (ValuesListIterable is not a generator), so stream values() dicts instead
+        queryset = self.queryset().order_by('id').values(*lookups)
+        async for row in queryset.aiterator(chunk_size=chunk_size):
+            yield tuple(row[lookup] for lookup in lookups)
+
+
+@dataclass(frozen=True)
+class AthleteFilter(FilterSpec):
+    q: str = ''
+    sport: str = ''
+
+    model: ClassVar = Athlete
+    # The sport filter and facet go through discipline names
+    depends_on: ClassVar = (Athlete, Discipline)
+    facet_fields: ClassVar = ('sport',)
+    # Sports are counted per discipline, so multi-sport athletes appear under each of theirs
+    facet_lookups: ClassVar = {'sport': 'disciplines__name'}
+    # Columns the athlete cards read
+    list_fields: ClassVar = ('id', 'name', 'country', 'sport')
+
+    def filter(self, athletes):
+        # Search by name or country, then the sport through the indexed athlete-discipline join
+        if self.q:
+            athletes = search_athletes(athletes, self.q)
+        if self.sport:
+            athletes = athletes.filter(disciplines__name=self.sport)
+        return athletes
+
+    def list_queryset(self):
+        return self.queryset().only(*self.list_fields)
+
+
+@dataclass(frozen=True)
+class EventFilter(FilterSpec):
+    q: str = ''
+    sport_code: str = ''
+
+    model: ClassVar = Event
+    depends_on: ClassVar = (Event,)
+    facet_fields: ClassVar = ('sport_code',)
+    list_fields: ClassVar = ('id', 'name', 'sport', 'sport_code')
+
+    def filter(self, events):
+        if self.q:
+            events = events.filter(Q(name__icontains=self.q) | Q(sport__icontains=self.q))
+        if self.sport_code:
+            events = events.filter(sport_code=self.sport_code)
+        return events
+
+    def list_queryset(self):
+        return self.queryset().only(*self.list_fields)
+
+
+@dataclass(frozen=True)
+class MedalFilter(FilterSpec):
+    medal_type: str = ''
+    athlete_name: str = ''
+    country: str = ''
+
+    model: ClassVar = Medal
+    # Exports and the athlete_name filter also read athlete and event names, the country filter and facet country names
+    depends_on: ClassVar = (Medal, Athlete, Event, Country)
+    facet_fields: ClassVar = ('medal_type', 'country')
+    # Countries are offered by NOC code and shown by name
+    facet_lookups: ClassVar = {'country': 'noc__code'}
+    facet_labels: ClassVar = {'country': 'noc__name'}
+    # Columns the medal cards read, with the athlete and event names joined in
+    list_fields: ClassVar = ('id', 'medal_type', 'country')
+    list_names: ClassVar = {'athlete_name': F('athlete__name'), 'event_name': F('event__name')}
+
+    def filter(self, medals):
+        if self.medal_type:
+            medals = medals.filter(medal_type=self.medal_type)
+        if self.athlete_name:
+            medals = medals.filter(athlete__name__icontains=self.athlete_name)
+        if self.country:
+            # The NOC code from the dropdown, or a country name typed into an old link
+            medals = medals.filter(Q(noc__code=self.country.upper()) | Q(noc__name__iexact=self.country))
+        return medals
+
+    def list_queryset(self):
+        # Flat rows instead of model instances, so the template cannot trigger per-row lookups
+        return self.queryset().values(*self.list_fields, **self.list_names)
+
+
+FILTERS = {
+    'athletes': AthleteFilter,
+    'events': EventFilter,
+    'medals': MedalFilter,
+}
@@ -1,69 +1,395 @@
+import ast
+import hashlib
+import json
 import os
+from collections import Counter
+from dataclasses import dataclass, field
+
 import pandas as pd
-from olympics.models import Athlete, Event, Medal
 from django.conf import settings
+from django.db import transaction
+from olympics import facets, timeline
+from olympics.models import Athlete, Country, Discipline, Event, Medal, MedalType
+from olympics.versions import bump_version
 
 DATA_FOLDER = os.path.join(settings.BASE_DIR, 'data')
+BATCH_SIZE = getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
 
-def import_athletes():
-    file_path = os.path.join(DATA_FOLDER, 'athletes.csv')
-    print(f"Loading athletes data from: {file_path}")
-    df = pd.read_csv(file_path)
-    for _, row in df.iterrows():
-        Athlete.objects.create(
-            name=row['name'],
-            country=row['country'],
-            sport=row['disciplines'],
-            birth_date=row.get('birth_date', None),
-            birth_place=row.get('birth_place', ""),
-            height=row.get('height', None),
-            weight=row.get('weight', None),
-            coach=row.get('coach', "")
-        )
-    print("Athletes data imported successfully.")
-
-
-def import_events():
-    file_path = os.path.join(DATA_FOLDER, 'events.csv')
-    print(f"Loading events data from: {file_path}")
-    df = pd.read_csv(file_path)
-    for _, row in df.iterrows():
-        Event.objects.create(
-            name=row['event'],
-            sport=row['sport'],
-            sport_code=row['sport_code']
-        )
-    print("Events data imported successfully.")
-
-def import_medals():
-    file_path = os.path.join(DATA_FOLDER, 'medals.csv')
-    print(f"Loading medals data from: {file_path}")
-    df = pd.read_csv(file_path)
-
-    for _, row in df.iterrows():
-        # Debugging outputs
-        print(f"Processing medal row: {row}")
-
-        # Fetch the athlete and event
-        athlete = Athlete.objects.filter(name=row['name']).first()
-        event = Event.objects.filter(name=row['event']).first()
-
-        # Ensure athlete and event exist
-        if not athlete:
-            print(f"Warning: Athlete '{row['name']}' not found.")
-            continue
-        if not event:
-            print(f"Warning: Event '{row['event']}' not found.")
-            continue
-
-        # Create the medal entry
-        Medal.objects.create(
-            medal_type=row['medal_type'],
-            medal_date=row.get('medal_date', None),
-            athlete=athlete,
-            discipline=row.get('discipline', ""),
-            event=event,
-            country=row['country']
+
+# Medals for these event types are awarded to a team or pair, so `name` is not an athlete
+TEAM_EVENT_TYPES = {'TEAM', 'HTEAM', 'COUP', 'HCOUP'}
+
+# Athlete.sport lists an athlete's disciplines joined with this
+SPORT_SEPARATOR = ', '
+
+# One medal per competitor (athlete or team code) and event; medal_code alone repeats for shared bronzes.
+# Medals stored or read without a code are matched on the legacy key instead.
+MEDAL_KEY = ['code', 'event_id']
+MEDAL_LEGACY_KEY = ['athlete_id', 'event_id', 'country', 'medal_type']
+
+
+@dataclass
+class ImportResult:
+    table: str
+    read: int = 0
+    created: int = 0
+    rejected: int = 0
+    reasons: dict = field(default_factory=dict)
+    # Set by the sync_* functions only
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+def read_csv(file_name, data_folder=None):
+    file_path = os.path.join(data_folder or DATA_FOLDER, file_name)
+    return pd.read_csv(file_path)
+
+
+def _to_date(series):
+    # Unparseable or missing dates become NaT and are turned into None by _to_records
+    return pd.to_datetime(series, errors='coerce').dt.date
+
+
+def _to_number(series):
+    return pd.to_numeric(series, errors='coerce')
+
+
+def _to_records(df):
+    # Swap every NaN/NaT for None in one pass instead of checking each cell
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    for record in records:
+        record['row_hash'] = _row_hash(record)
+    return records
+
+
+def _row_hash(record):
+    # Every field in column order, so a change to any CSV value changes the hash
+    return hashlib.sha1(json.dumps(list(record.values()), default=str).encode()).hexdigest()
+
+
+def _to_code(series):
+    # Numeric codes read as floats when the column has gaps ("1903136.0"); keep them as plain strings
+    if pd.api.types.is_float_dtype(series):
+        series = series.astype('Int64')
+    return series.astype('string')
+
+
+def _column(df, name):
+    # Optional CSV columns are treated as all-missing
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _drop_existing(df, model, key_fields):
+    # Skip rows whose natural key is already stored so re-running an import is a no-op
+    existing = pd.DataFrame(
+        list(model.objects.values_list(*key_fields)), columns=key_fields, dtype=object
+    )
+    df = df.drop_duplicates(subset=key_fields)
+    if existing.empty:
+        return df
+    keys = df[key_fields].astype(object).where(df[key_fields].notna(), None)
+    merged = keys.merge(existing.drop_duplicates(), on=key_fields, how='left', indicator=True)
+    return df[(merged['_merge'] == 'left_only').to_numpy()]
+
+
+def _bulk_insert(model, rows, batch_size):
+    objects = [model(**row) for row in rows]
+    with transaction.atomic():
+        model.objects.bulk_create(objects, batch_size=batch_size)
+        if model in RELATED_WRITERS:
+            RELATED_WRITERS[model](objects, batch_size)
+        # bulk_create skips post_save, so refresh the timeline and cached results here
+        if objects:
+            if model is Medal:
+                timeline.rebuild()
+            bump_version(model)
+    return len(objects)
+
+
+def _country_ids(df):
+    """Country id per row from its `country_code`, storing countries seen for the first time."""
+    countries = pd.DataFrame({
+        'code': _column(df, 'country_code'),
+        'name': df['country'],
+        # medals.csv calls it country_long, athletes.csv country_full
+        'long_name': _column(df, 'country_long').fillna(_column(df, 'country_full')),
+    }).dropna(subset=['code', 'name']).drop_duplicates('code')
+    # Only new or renamed countries are written, so an unchanged file keeps the cached results
+    known = set(Country.objects.values_list('code', 'name', 'long_name'))
+    changed = [
+        Country(code=row.code, name=row.name, long_name=row.long_name or '')
+        for row in countries.astype(object).where(countries.notna(), None).itertuples()
+        if (row.code, row.name, row.long_name or '') not in known
+    ]
+    if changed:
+        Country.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=['code'], update_fields=['name', 'long_name'],
         )
-    print("Medals data imported successfully.")
+        bump_version(Country)
+        facets.invalidate(Country)
+
+    # Rows without a code (older CSVs) fall back to an unambiguous country name
+    stored = pd.DataFrame(list(Country.objects.values_list('id', 'code', 'name')), columns=['id', 'code', 'name'])
+    by_code = stored.set_index('code')['id']
+    by_name = stored.drop_duplicates('name', keep=False).set_index('name')['id']
+    ids = _column(df, 'country_code').map(by_code).fillna(df['country'].map(by_name))
+    return ids.astype('Int64')
+
+
+def _sport_names(value):
+    # athletes.csv stores "['Marathon Swimming', 'Swimming']"; a plain name is one discipline
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        parsed = value
+    names = parsed if isinstance(parsed, (list, tuple)) else [parsed]
+    return [str(name).strip() for name in names if name and str(name).strip()]
+
+
+def _sport_labels(series):
+    return series.map(lambda value: SPORT_SEPARATOR.join(_sport_names(value)) if isinstance(value, str) else None)
+
+
+def _link_disciplines(athletes, batch_size):
+    """Point each athlete's disciplines at the names in its sport label, adding new disciplines."""
+    links = {athlete.id: athlete.sport.split(SPORT_SEPARATOR) if athlete.sport else [] for athlete in athletes}
+    names = sorted({name for row in links.values() for name in row})
+    ids = dict(Discipline.objects.filter(name__in=names).values_list('name', 'id'))
+    new = [Discipline(name=name) for name in names if name not in ids]
+    if new:
+        Discipline.objects.bulk_create(new, ignore_conflicts=True)
+        ids = dict(Discipline.objects.filter(name__in=names).values_list('name', 'id'))
+        bump_version(Discipline)
+        facets.invalidate(Discipline)
+
+    Link = Athlete.disciplines.through
+    athlete_ids = list(links)
+    for start in range(0, len(athlete_ids), batch_size):
+        Link.objects.filter(athlete_id__in=athlete_ids[start:start + batch_size]).delete()
+    Link.objects.bulk_create(
+        [Link(athlete_id=athlete_id, discipline_id=ids[name]) for athlete_id, row in links.items() for name in row],
+        batch_size=batch_size,
+    )
+
+
+def _athlete_rows(df):
+    return pd.DataFrame({
+        'code': _to_code(_column(df, 'code')),
+        'name': df['name'],
+        'country': df['country'],
+        'noc_id': _country_ids(df),
+        'sport': _sport_labels(df['disciplines']),
+        'birth_date': _to_date(_column(df, 'birth_date')),
+        'birth_place': _column(df, 'birth_place'),
+        'height': _to_number(_column(df, 'height')),
+        'weight': _to_number(_column(df, 'weight')),
+        'coach': _column(df, 'coach'),
+    })
+
+
+def import_athletes(data_folder=None, batch_size=BATCH_SIZE):
+    df = read_csv('athletes.csv', data_folder)
+    rows = _drop_existing(_athlete_rows(df), Athlete, ['name', 'country', 'birth_date'])
+    created = _bulk_insert(Athlete, _to_records(rows), batch_size)
+    return ImportResult('athletes', read=len(df), created=created)
+
+
+def sync_athletes(data_folder=None, batch_size=BATCH_SIZE):
+    df = read_csv('athletes.csv', data_folder)
+    return _sync(
+        ImportResult('athletes', read=len(df)), Athlete, _athlete_rows(df), batch_size,
+        key_fields=['code'], legacy_fields=['name', 'country', 'birth_date'],
+    )
+
+
+def _event_rows(df):
+    return pd.DataFrame({
+        'name': df['event'],
+        'sport': df['sport'],
+        'sport_code': df['sport_code'],
+    })
+
+
+def import_events(data_folder=None, batch_size=BATCH_SIZE):
+    df = read_csv('events.csv', data_folder)
+    rows = _drop_existing(_event_rows(df), Event, ['name', 'sport'])
+    created = _bulk_insert(Event, _to_records(rows), batch_size)
+    return ImportResult('events', read=len(df), created=created)
+
+
+def sync_events(data_folder=None, batch_size=BATCH_SIZE):
+    df = read_csv('events.csv', data_folder)
+    return _sync(ImportResult('events', read=len(df)), Event, _event_rows(df), batch_size, key_fields=['name', 'sport'])
+
+
+def _name_key(series):
+    # athletes.csv stores "EVENEPOEL Remco" where medals.csv has "Remco EVENEPOEL"
+    return series.str.casefold().str.split().map(sorted).str.join(' ')
+
+
+def _athlete_ids(df):
+    athletes = pd.DataFrame(
+        list(Athlete.objects.order_by('id').values_list('id', 'code', 'name', 'country')),
+        columns=['athlete_id', 'code', 'name', 'country'],
+    )
+    athletes['name_key'] = _name_key(athletes['name'])
+    keys = pd.DataFrame({'name_key': _name_key(df['name']), 'country': df['country']})
+
+    # Match on the athlete code, then name and country, then the name alone when it is unambiguous
+    by_code = athletes.dropna(subset=['code']).set_index('code')['athlete_id']
+    ids = _to_code(_column(df, 'code')).map(by_code).reset_index(drop=True)
+    by_country = athletes.drop_duplicates(['name_key', 'country'])[['name_key', 'country', 'athlete_id']]
+    ids = ids.fillna(keys.merge(by_country, on=['name_key', 'country'], how='left')['athlete_id'])
+    by_name = athletes.drop_duplicates('name_key', keep=False).set_index('name_key')['athlete_id']
+    ids = ids.fillna(keys['name_key'].map(by_name).reset_index(drop=True))
+    return ids.to_numpy()
+
+
+def _event_ids(df):
+    events = pd.DataFrame(
+        list(Event.objects.order_by('id').values_list('id', 'name', 'sport')),
+        columns=['event_id', 'event', 'discipline'],
+    )
+    # Event names repeat across sports ("Men's Individual"), so match on the discipline too
+    events = events.drop_duplicates(['event', 'discipline'])
+    keys = df[['event']].assign(discipline=_column(df, 'discipline'))
+    return keys.merge(events, on=['event', 'discipline'], how='left')['event_id'].to_numpy()
+
+
+def _medal_rows(df, rejects_path=None):
+    # Resolve the foreign keys for every row with in-memory joins
+    df['athlete_id'] = _athlete_ids(df)
+    df['event_id'] = _event_ids(df)
+    df['noc_id'] = _country_ids(df)
+    team = _column(df, 'event_type').isin(TEAM_EVENT_TYPES)
+
+    df['reject_reason'] = None
+    df.loc[df['athlete_id'].isna() & ~team, 'reject_reason'] = 'athlete not found'
+    df.loc[df['event_id'].isna(), 'reject_reason'] = 'event not found'
+    rejects = df[df['reject_reason'].notna()]
+    if rejects_path and not rejects.empty:
+        rejects.drop(columns=['athlete_id', 'event_id', 'noc_id']).to_csv(rejects_path, index=False)
+
+    df = df[df['reject_reason'].isna()]
+    # Prefer the CSV's medal_code and derive it from the label where it is missing
+    medal_code = _to_number(_column(df, 'medal_code')).fillna(df['medal_type'].map(MedalType.from_label))
+    rows = pd.DataFrame({
+        'code': _to_code(_column(df, 'code')),
+        'medal_type': df['medal_type'],
+        'medal_code': medal_code.astype('Int64'),
+        'medal_date': _to_date(_column(df, 'medal_date')),
+        'athlete_id': df['athlete_id'].where(~team[df.index]).astype('Int64'),
+        'discipline': _column(df, 'discipline'),
+        'event_id': df['event_id'].astype('Int64'),
+        'country': df['country'],
+        'noc_id': df['noc_id'],
+    })
+    return rows, rejects
+
+
+def import_medals(data_folder=None, batch_size=BATCH_SIZE, rejects_path=None):
+    df = read_csv('medals.csv', data_folder)
+    rows, rejects = _medal_rows(df, rejects_path)
+    # The key sync_medals matches on, so a later sync finds exactly the medals this creates
+    coded = rows['code'].notna()
+    rows = pd.concat([
+        _drop_existing(rows[coded], Medal, MEDAL_KEY),
+        _drop_existing(rows[~coded], Medal, MEDAL_LEGACY_KEY),
+    ])
+    if Medal.objects.filter(code__isnull=True).exists():
+        rows = _drop_existing(rows, Medal, MEDAL_LEGACY_KEY)
+    created = _bulk_insert(Medal, _to_records(rows), batch_size)
+    return ImportResult(
+        'medals', read=len(df), created=created, rejected=len(rejects),
+        reasons=rejects['reject_reason'].value_counts().to_dict(),
+    )
+
+
+def sync_medals(data_folder=None, batch_size=BATCH_SIZE, rejects_path=None):
+    df = read_csv('medals.csv', data_folder)
+    rows, rejects = _medal_rows(df, rejects_path)
+    result = ImportResult(
+        'medals', read=len(df), rejected=len(rejects), reasons=rejects['reject_reason'].value_counts().to_dict(),
+    )
+    return _sync(result, Medal, rows, batch_size, key_fields=MEDAL_KEY, legacy_fields=MEDAL_LEGACY_KEY)
+
+
+def _key(record, fields):
+    return tuple(record[name] for name in fields)
+
+
+def _sync(result, model, rows, batch_size, key_fields, legacy_fields=()):
+    """Make the `model` table match `rows`, writing only the rows whose hash changed.
+
+    Rows are matched on `key_fields`. Stored rows with no key yet (loaded
+    before the key was recorded) are matched once on `legacy_fields` and
+    take the key over. Stored rows missing from `rows` are deleted, as are
+    all but the oldest of stored rows that share a key.
+    """
+    missing = rows[key_fields].isna().any(axis=1)
+    if len(rows) and missing.all():
+        # Most likely an older CSV without the key column; matching nothing would delete every stored row
+        raise ValueError(f"{result.table}: no row has {', '.join(key_fields)}, which a sync needs")
+    if missing.any():
+        result.rejected += int(missing.sum())
+        result.reasons['missing key'] = int(missing.sum())
+    records = _to_records(rows[~missing].drop_duplicates(subset=key_fields))
+
+    tracked = timeline.TRACKED_FIELDS.get(model, [])
+    stored, legacy, old_values = {}, {}, {}
+    for values in model.objects.order_by('id').values('id', 'row_hash', *{*key_fields, *legacy_fields, *tracked}):
+        old_values[values['id']] = {name: values[name] for name in tracked}
+        if any(values[name] is None for name in key_fields):
+            legacy.setdefault(_key(values, legacy_fields), []).append(values)
+        else:
+            stored.setdefault(_key(values, key_fields), []).append(values)
+
+    created, updated = [], []
+    for record in records:
+        # The oldest stored row with the key is kept; the others are left over and deleted below
+        candidates = stored.get(_key(record, key_fields))
+        match = candidates.pop(0) if candidates else None
+        if match is None and legacy_fields:
+            candidates = legacy.get(_key(record, legacy_fields))
+            match = candidates.pop() if candidates else None
+        if match is None:
+            created.append(model(**record))
+        elif match['row_hash'] != record['row_hash']:
+            updated.append(model(id=match['id'], **record))
+        else:
+            result.unchanged += 1
+    deleted = [values['id'] for candidates in stored.values() for values in candidates]
+    deleted += [values['id'] for candidates in legacy.values() for values in candidates]
+
+    # Timeline deltas for the rows written here; deletions go through delete(), whose signals update it
+    days = Counter()
+    for instance in created:
+        days.update(timeline.contributions(model, timeline.tracked_values(instance)))
+    for instance in updated:
+        days.subtract(timeline.contributions(model, old_values[instance.id]))
+        days.update(timeline.contributions(model, timeline.tracked_values(instance)))
+
+    fields = list(records[0]) if records else []
+    with transaction.atomic():
+        model.objects.bulk_create(created, batch_size=batch_size)
+        model.objects.bulk_update(updated, fields, batch_size=batch_size)
+        if model in RELATED_WRITERS:
+            RELATED_WRITERS[model](created + updated, batch_size)
+        for start in range(0, len(deleted), batch_size):
+            model.objects.filter(id__in=deleted[start:start + batch_size]).delete()
+        if created or updated:
+            timeline.apply(days)
+            bump_version(model)
+            facets.invalidate(model)
+
+    result.created, result.updated, result.deleted = len(created), len(updated), len(deleted)
+    return result
+
 
+# Rows written alongside a model's bulk inserts and updates
+RELATED_WRITERS = {
+    Athlete: _link_disciplines,
+}
@@ -0,0 +1,113 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .filters import FILTERS
+from .models import ExportJob
+from .reports import REPORTS, render_pdf
+from .workers import process_pool
+
+EXPORT_ROOT = getattr(settings, 'EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'exports'))
+
+# Worker processes for PDF jobs; 0 renders inside the request (handy for tests)
+PDF_EXPORT_WORKERS = getattr(settings, 'PDF_EXPORT_WORKERS', 2)
+
+# A job still pending or running after this long is assumed lost and is not reused
+STALE_JOB_AFTER = timedelta(minutes=getattr(settings, 'EXPORT_JOB_TIMEOUT_MINUTES', 15))
+# Jobs and their PDFs are kept this long (and at least until a pending job would be stale)
+EXPORT_RETENTION = max(timedelta(hours=getattr(settings, 'EXPORT_RETENTION_HOURS', 24)), STALE_JOB_AFTER)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Workers write where this process would, even when EXPORT_ROOT was changed at runtime
+        _executor = process_pool(PDF_EXPORT_WORKERS, django_settings={'EXPORT_ROOT': EXPORT_ROOT})
+    return _executor
+
+
+def fingerprint(report, spec):
+    # Same report, same filters and same data -> same PDF
+    return hashlib.sha1(spec.cache_key(f"pdf:{report}").encode()).hexdigest()
+
+
+def submit_export(report, spec):
+    """Return a job producing the PDF for `report` filtered by `spec`, reusing an identical one if possible."""
+    key = fingerprint(report, spec)
+    reusable = ExportJob.objects.filter(fingerprint=key).exclude(status=ExportJob.FAILED).order_by('-created_at')
+    for job in reusable:
+        if job.status == ExportJob.DONE and os.path.exists(job_path(job)):
+            return job
+        if job.status in (ExportJob.PENDING, ExportJob.RUNNING) and job.created_at > timezone.now() - STALE_JOB_AFTER:
+            return job
+
+    prune_exports()
+    job = ExportJob.objects.create(report=report, params=spec.params(), fingerprint=key)
+    if PDF_EXPORT_WORKERS:
+        get_executor().submit(run_export_job, job.id)
+    else:
+        run_export_job(job.id)
+        job.refresh_from_db()
+    return job
+
+
+def job_path(job):
+    return os.path.join(EXPORT_ROOT, job.file)
+
+
+def prune_exports():
+    """Delete jobs older than EXPORT_RETENTION and the files in EXPORT_ROOT no remaining job points at.
+
+    Run before each new job, so the folder holds at most the PDFs of the
+    last EXPORT_RETENTION. A file is only removed once it is older than
+    STALE_JOB_AFTER: a running job writes its PDF before recording it.
+    """
+    now = timezone.now()
+    ExportJob.objects.filter(created_at__lt=now - EXPORT_RETENTION).delete()
+    try:
+        names = os.listdir(EXPORT_ROOT)
+    except FileNotFoundError:
+        return
+    kept = set(ExportJob.objects.exclude(file='').values_list('file', flat=True))
+    cutoff = (now - STALE_JOB_AFTER).timestamp()
+    for name in names:
+        path = os.path.join(EXPORT_ROOT, name)
+        if name in kept or not os.path.isfile(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # Removed by another process
+
+
+def run_export_job(job_id):
+    job = ExportJob.objects.get(id=job_id)
+    job.status = ExportJob.RUNNING
+    job.save(update_fields=['status'])
+
+    build = REPORTS[job.report]
+    spec = FILTERS[job.report].from_params(job.params)
+    job.file = f"{job.report}-{job.fingerprint}.pdf"
+    path = job_path(job)
+    tmp_path = f"{path}.{job.id}.tmp"
+    try:
+        os.makedirs(EXPORT_ROOT, exist_ok=True)
+        with open(tmp_path, 'wb') as dest:
+            ok = render_pdf(*build(spec), dest)
+        if not ok:
+            raise RuntimeError('We had some errors with generating your PDF.')
+        os.replace(tmp_path, path)
+        job.status = ExportJob.DONE
+    except Exception as exc:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = ExportJob.FAILED
+        job.error = str(exc)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'error', 'finished_at'])
@@ -0,0 +1,235 @@
+import json
+import re
+import resource
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from olympics import import_data, synthetic, urls
+from olympics.models import Discipline, Event, ExportJob, Medal
+from olympics.perf import RequestStats, percentile
+
+# URL names that cannot be fetched with a plain GET by a logged-in user
+SKIPPED_URLS = {'logout'}
+
+
+def filtered_params():
+    # Filters that match part of the generated data, per URL name
+    sport = Discipline.objects.values_list('name', flat=True).first()
+    sport_code = Event.objects.values_list('sport_code', flat=True).first()
+    country = Medal.objects.values_list('noc__code', flat=True).first()
+    discipline = Medal.objects.values_list('discipline', flat=True).first()
+    athletes = {'q': 'an', 'sport': sport}
+    events = {'q': 'men', 'sport_code': sport_code}
+    medals = {'medal_type': 'Gold Medal', 'country': country}
+    return {
+        'athletes_list': athletes,
+        'export_athletes_csv': athletes,
+        'export_athletes_pdf': athletes,
+        'athletes_api': athletes,
+        'events_list': events,
+        'export_events_csv': events,
+        'export_events_pdf': events,
+        'events_api': events,
+        'medals_list': medals,
+        'export_medals_csv': medals,
+        'export_medals_pdf': medals,
+        'medals_api': medals,
+        'medal_standings': {'discipline': discipline},
+        'medal_standings_json': {'discipline': discipline},
+        'athletes_physique_graph': {'sport': sport},
+        'athletes_physique_json': {'sport': sport},
+    }
+
+
+def url_cases(only=None):
+    """(name, url) for every parameterless GET route, unfiltered and filtered."""
+    variants = filtered_params()
+    cases, seen = [], set()
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        if not isinstance(pattern, URLPattern) or pattern.pattern.converters or name in SKIPPED_URLS:
+            continue
+        if name in seen or (only and not re.search(only, name)):
+            continue
+        seen.add(name)
+        url = reverse(name)
+        cases.append((name, url))
+        if name in variants:
+            cases.append((f"{name} (filtered)", f"{url}?{urlencode(variants[name])}"))
+    return cases
+
+
+async def _drain(response):
+    return sum([len(chunk) async for chunk in response.streaming_content])
+
+
+def _consume(response):
+    if response.streaming:
+        # CSV exports stream from async iterators
+        if response.is_async:
+            return async_to_sync(_drain)(response)
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _wait_for_export(response, timeout=600):
+    # PDF views start a job and redirect to its status page; time until the file exists
+    job_id = response.url.rstrip('/').rsplit('/', 1)[-1]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = ExportJob.objects.get(id=job_id)
+        if job.status in (ExportJob.DONE, ExportJob.FAILED):
+            return job.status
+        time.sleep(0.05)
+    raise CommandError(f"Export job {job_id} did not finish within {timeout}s")
+
+
+def fetch(client, url):
+    stats = RequestStats()
+    started = time.perf_counter()
+    with connection.execute_wrapper(stats):
+        response = client.get(url)
+        size = _consume(response)
+    if response.status_code == 302 and '/export/jobs/' in response.get('Location', ''):
+        _wait_for_export(response)
+    elapsed = time.perf_counter() - started
+    return {
+        'status': response.status_code,
+        'ms': elapsed * 1000,
+        'sql_count': stats.sql_count,
+        'sql_ms': stats.sql_time * 1000,
+        'bytes': size,
+        'n_plus_one': stats.repeated_queries(),
+    }
+
+
+def measure_url(client, name, url, repeat):
+    # The first request pays for cold caches (counts, charts, PDF jobs); the rest show the warm path
+    samples = [fetch(client, url) for _ in range(repeat + 1)]
+    cold, warm = samples[0], samples[1:] or samples
+    times = sorted(sample['ms'] for sample in warm)
+
+    # One more request under tracemalloc, kept apart because tracing slows everything down
+    tracemalloc.start()
+    fetch(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'url': url,
+        'status': cold['status'],
+        'cold_ms': round(cold['ms'], 2),
+        'p50_ms': round(percentile(times, 50), 2),
+        'p95_ms': round(percentile(times, 95), 2),
+        'p99_ms': round(percentile(times, 99), 2),
+        'max_ms': round(times[-1], 2),
+        'sql_count': warm[-1]['sql_count'],
+        'cold_sql_count': cold['sql_count'],
+        'sql_ms': round(percentile(sorted(sample['sql_ms'] for sample in warm), 50), 2),
+        'bytes': cold['bytes'],
+        'peak_kb': peak // 1024,
+        'n_plus_one': cold['n_plus_one'],
+    }
+
+
+def measure_import(data_folder):
+    results = []
+    for table, load in (
+        ('events', import_data.import_events),
+        ('athletes', import_data.import_athletes),
+        ('medals', import_data.import_medals),
+    ):
+        # Each import runs once, so it is timed without tracemalloc and memory comes from the RSS high-water mark
+        started = time.perf_counter()
+        result = load(data_folder=data_folder)
+        elapsed = time.perf_counter() - started
+        results.append({
+            'table': table,
+            'read': result.read,
+            'created': result.created,
+            'rejected': result.rejected,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(result.read / elapsed) if elapsed else None,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        })
+    return results
+
+
+class Command(BaseCommand):
+    help = ('Generate synthetic data at a multiple of the real volumes in a throwaway SQLite database, '
+            'then time the import and every page, export and chart.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=10,
+                            help='Multiple of the real data/*.csv row counts to generate (default: %(default)s).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed requests per URL after the first, cold one (default: %(default)s).')
+        parser.add_argument('--only', help='Only benchmark URL names matching this regular expression.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark.json',
+                            help='Where to write the JSON report (default: %(default)s, "-" for stdout).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The benchmark runs against a throwaway SQLite database.')
+
+        with synthetic.benchmark_database(options['scale'], seed=options['seed']) as (data_folder, rows, volumes):
+            self.stderr.write(f"Generated {rows} (x{options['scale']:g} of {volumes})")
+            report = self.run_benchmark(data_folder, rows, volumes, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+            self.print_summary(report)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def run_benchmark(self, data_folder, rows, volumes, options):
+        imports = measure_import(data_folder)
+        for result in imports:
+            self.stderr.write(f"Imported {result['table']}: {result['rows_per_sec']:,} rows/sec")
+
+        user = User.objects.create_user('benchmark', is_staff=True)
+        client = Client()
+        client.force_login(user)
+
+        results = []
+        for name, url in url_cases(options['only']):
+            self.stderr.write(f"Timing {url}")
+            results.append(measure_url(client, name, url, options['repeat']))
+
+        return {
+            'generated_at': timezone.now().isoformat(),
+            'scale': options['scale'],
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'base_volumes': volumes,
+            'rows': rows,
+            'import': imports,
+            'urls': results,
+            # ru_maxrss is in kilobytes on Linux
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def print_summary(self, report):
+        self.stdout.write(
+            f"{'url':<50}  {'status':>6}  {'cold ms':>9}  {'p50 ms':>9}  {'p95 ms':>9}  {'queries':>7}  {'peak KB':>8}"
+        )
+        for row in report['urls']:
+            flag = '  N+1' if row['n_plus_one'] else ''
+            self.stdout.write(
+                f"{row['url'][:50]:<50}  {row['status']:>6}  {row['cold_ms']:>9.1f}  {row['p50_ms']:>9.1f}  "
+                f"{row['p95_ms']:>9.1f}  {row['sql_count']:>7}  {row['peak_kb']:>8}{flag}"
+            )
@@ -0,0 +1,118 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from olympics import analytics, import_data, synthetic
+from olympics.models import Athlete, Event, Medal
+from olympics.perf import percentile
+
+
+def _ranking(queryset, field, limit=None):
+    rows = (
+        queryset.exclude(**{f"{field}__isnull": True}).values(field).annotate(count=Count('id'))
+        .order_by('-count', field).values_list(field, 'count')
+    )
+    return list(rows[:limit] if limit else rows)
+
+
+# Name -> (ORM query, the same answer from the snapshot), for what the charts and home() show
+QUERIES = {
+    'totals': (
+        lambda: {'athletes': Athlete.objects.count(), 'events': Event.objects.count(), 'medals': Medal.objects.count()},
+        lambda snapshot: snapshot.totals(),
+    ),
+    'top_athletes': (
+        lambda: list(Athlete.objects.order_by('name', 'id').values('name', 'sport')[:5]),
+        lambda snapshot: snapshot.head('athletes', ['name', 'sport'], 5),
+    ),
+    'top_events': (
+        lambda: list(Event.objects.order_by('sport', 'name', 'id').values('name', 'sport')[:5]),
+        lambda snapshot: snapshot.head('events', ['name', 'sport'], 5),
+    ),
+    'athletes_top_countries': (
+        lambda: _ranking(Athlete.objects, 'noc__name', 10),
+        lambda snapshot: snapshot.count_by('athletes', 'country', 10),
+    ),
+    'athletes_by_country': (
+        lambda: _ranking(Athlete.objects, 'noc__name'),
+        lambda snapshot: snapshot.count_by('athletes', 'country'),
+    ),
+    'events_by_sport': (
+        lambda: _ranking(Event.objects, 'sport', 10),
+        lambda snapshot: snapshot.count_by('events', 'sport', 10),
+    ),
+    'medals_by_country': (
+        lambda: _ranking(Medal.objects, 'noc__name'),
+        lambda snapshot: snapshot.count_by('medals', 'country'),
+    ),
+    'gold_medals_by_country': (
+        lambda: _ranking(Medal.objects.filter(medal_type='Gold Medal'), 'noc__name'),
+        lambda snapshot: snapshot.count_by('medals', 'country', medal_type='Gold Medal'),
+    ),
+}
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return result, times
+
+
+class Command(BaseCommand):
+    help = ('Compare the dashboard aggregations run through the ORM with the in-memory analytics snapshot, '
+            'and report the memory the snapshot takes, in a throwaway SQLite database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1,
+                            help='Multiple of the real data/*.csv row counts to generate (default: %(default)s).')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Timed runs of each query per path (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The benchmark runs against a throwaway SQLite database.')
+
+        with synthetic.benchmark_database(options['scale']) as (data_folder, rows, _):
+            self.stderr.write(f"Loading {rows}")
+            import_data.import_events(data_folder=data_folder)
+            import_data.import_athletes(data_folder=data_folder)
+            import_data.import_medals(data_folder=data_folder)
+
+            analytics.clear()
+            started = time.perf_counter()
+            snapshot = analytics.get_snapshot()
+            load_ms = (time.perf_counter() - started) * 1000
+            _, check_times = timed(analytics.get_snapshot, options['repeat'])
+
+            results = []
+            for name, (orm, vectorized) in QUERIES.items():
+                expected, orm_times = timed(orm, options['repeat'])
+                answer, snapshot_times = timed(lambda: vectorized(snapshot), options['repeat'])
+                if answer != expected:
+                    raise CommandError(f"{name}: the snapshot answered {answer!r}, the ORM {expected!r}")
+                results.append((name, percentile(orm_times, 50), percentile(snapshot_times, 50)))
+            usage = snapshot.memory_usage()
+
+        self.stdout.write(f"{'table.column':<32}  {'dtype':<14}  {'bytes':>10}  {'as objects':>10}")
+        for row in usage:
+            self.stdout.write(
+                f"{row['table'] + '.' + row['column']:<32}  {row['dtype']:<14}  "
+                f"{row['bytes']:>10,}  {row['object_bytes']:>10,}"
+            )
+        total = sum(row['bytes'] for row in usage)
+        plain = sum(row['object_bytes'] for row in usage)
+        self.stdout.write(f"{'total':<32}  {'':<14}  {total:>10,}  {plain:>10,}")
+        self.stdout.write(
+            f"\nSnapshot loaded in {load_ms:.1f} ms; version check {percentile(check_times, 50):.2f} ms (p50)\n"
+        )
+
+        self.stdout.write(f"{'query':<24}  {'ORM p50 ms':>10}  {'snapshot p50 ms':>15}  {'speedup':>7}")
+        for name, orm_ms, snapshot_ms in results:
+            speedup = orm_ms / snapshot_ms if snapshot_ms else 0
+            self.stdout.write(f"{name:<24}  {orm_ms:>10.3f}  {snapshot_ms:>15.3f}  {speedup:>6.1f}x")
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+
+from olympics import import_data, synthetic
+from olympics.perf import percentile
+
+# Read-only pages, API calls, an export and a chart, requested round-robin
+DEFAULT_URLS = [
+    '/',
+    '/athletes/?q=an',
+    '/medals/?medal_type=Gold+Medal',
+    '/api/athletes/?page_size=50',
+    '/api/medals/facets/',
+    '/export/events/csv/',
+    '/events/visualization/',
+]
+
+
+async def _drain(response):
+    return sum([len(chunk) async for chunk in response.streaming_content])
+
+
+def _consume(response):
+    # CSV exports stream from a sync iterator under WSGI and an async one under ASGI
+    if response.is_async:
+        return async_to_sync(_drain)(response)
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def run_wsgi(urls, total, concurrency, session_key):
+    """`total` requests through the sync (WSGI) handler from `concurrency` threads."""
+    jobs = itertools.islice(itertools.cycle(urls), total)
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def worker():
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        while True:
+            with lock:
+                url = next(jobs, None)
+            if url is None:
+                break
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                _consume(response)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors.append(url)
+        connections.close_all()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+async def run_asgi(urls, total, concurrency, session_key):
+    """`total` requests through the async (ASGI) handler from `concurrency` tasks on one event loop."""
+    jobs = itertools.islice(itertools.cycle(urls), total)
+    latencies, errors = [], []
+
+    async def worker():
+        client = AsyncClient()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        for url in jobs:
+            started = time.perf_counter()
+            response = await client.get(url)
+            if response.streaming:
+                await _drain(response)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors.append(url)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def summarize(mode, elapsed, latencies, errors):
+    latencies = sorted(latency * 1000 for latency in latencies)
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent-request throughput of the app under the WSGI handler (a thread per '
+            'request) and the ASGI handler (one event loop), on synthetic data in a throwaway database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1,
+                            help='Multiple of the real data volumes to load (default: %(default)s).')
+        parser.add_argument('--requests', type=int, default=300,
+                            help='Requests per mode (default: %(default)s).')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Requests in flight at once (default: %(default)s).')
+        parser.add_argument('--urls', nargs='+', default=DEFAULT_URLS)
+        parser.add_argument('--output', help='Also write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The benchmark runs against a throwaway SQLite database.')
+
+        with synthetic.benchmark_database(options['scale']) as (data_folder, rows, _):
+            self.stderr.write(f"Loading {rows}")
+            import_data.import_events(data_folder=data_folder)
+            import_data.import_athletes(data_folder=data_folder)
+            import_data.import_medals(data_folder=data_folder)
+
+            client = Client()
+            client.force_login(User.objects.create_user('benchmark'))
+            session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+            # One untimed pass fills the caches, so both modes measure the same warm path
+            for url in options['urls']:
+                response = client.get(url)
+                if response.status_code >= 400:
+                    raise CommandError(f"{url} returned {response.status_code}")
+                if response.streaming:
+                    _consume(response)
+
+            args = (options['urls'], options['requests'], options['concurrency'], session_key)
+            results = [
+                summarize('wsgi', *run_wsgi(*args)),
+                summarize('asgi', *async_to_sync(run_asgi)(*args)),
+            ]
+
+        self.stdout.write(
+            f"{'mode':<6}  {'requests':>8}  {'errors':>6}  {'req/sec':>8}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<6}  {row['requests']:>8}  {row['errors']:>6}  {row['requests_per_sec']:>8.1f}  "
+                f"{row['p50_ms']:>8.1f}  {row['p95_ms']:>8.1f}  {row['p99_ms']:>8.1f}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'scale': options['scale'], 'concurrency': options['concurrency'],
+                           'urls': options['urls'], 'results': results}, fh, indent=2)
+                fh.write('\n')
@@ -0,0 +1,99 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from olympics import import_data, synthetic
+from olympics.perf import RequestStats, percentile
+
+from .benchmark import _consume, url_cases
+
+# Session engine and authentication backend per configuration, the stock Django setup first
+CONFIGURATIONS = [
+    ('db', 'django.contrib.sessions.backends.db', 'django.contrib.auth.backends.ModelBackend'),
+    ('cached_db', 'django.contrib.sessions.backends.cached_db', 'olympics.auth.CachedModelBackend'),
+    ('signed_cookies', 'django.contrib.sessions.backends.signed_cookies', 'olympics.auth.CachedModelBackend'),
+]
+
+AUTH_TABLES = ('"django_session"', '"auth_user"')
+
+
+def measure(urls, session_engine, backend, repeat):
+    with override_settings(SESSION_ENGINE=session_engine, AUTHENTICATION_BACKENDS=[backend]):
+        cache.clear()
+        client = Client()
+        client.force_login(User.objects.get(username='benchmark'))
+        # One untimed pass fills the page caches, so only the session and user lookups differ
+        for url in urls:
+            _consume(client.get(url))
+
+        totals = {'requests': 0, 'queries': 0, 'auth_queries': 0, 'writes': 0}
+        times = []
+        for _ in range(repeat):
+            for url in urls:
+                stats = RequestStats()
+                started = time.perf_counter()
+                with connection.execute_wrapper(stats):
+                    _consume(client.get(url))
+                times.append((time.perf_counter() - started) * 1000)
+                totals['requests'] += 1
+                totals['queries'] += stats.sql_count
+                for shape, count in stats.shapes.items():
+                    if any(table in shape for table in AUTH_TABLES):
+                        totals['auth_queries'] += count
+                    if shape.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                        totals['writes'] += count
+
+    times.sort()
+    requests = totals['requests']
+    return {
+        'queries_per_request': totals['queries'] / requests,
+        'auth_queries_per_request': totals['auth_queries'] / requests,
+        'writes_per_request': totals['writes'] / requests,
+        'p50_ms': percentile(times, 50),
+        'p95_ms': percentile(times, 95),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Count database queries per logged-in request under database sessions, cached_db sessions '
+            'and signed-cookie sessions, in a throwaway SQLite database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1,
+                            help='Multiple of the real data/*.csv row counts to generate (default: %(default)s).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed passes over the URLs per configuration (default: %(default)s).')
+        parser.add_argument('--only', help='Only request URL names matching this regular expression.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The benchmark runs against a throwaway SQLite database.')
+
+        with synthetic.benchmark_database(options['scale']) as (data_folder, rows, _):
+            self.stderr.write(f"Loading {rows}")
+            import_data.import_events(data_folder=data_folder)
+            import_data.import_athletes(data_folder=data_folder)
+            import_data.import_medals(data_folder=data_folder)
+            User.objects.create_user('benchmark')
+
+            # PDF exports start background jobs; they are not page requests
+            urls = [url for name, url in url_cases(options['only']) if 'pdf' not in name]
+            results = []
+            for name, session_engine, backend in CONFIGURATIONS:
+                self.stderr.write(f"Requesting {len(urls)} URLs with {name} sessions")
+                results.append({'sessions': name, **measure(urls, session_engine, backend, options['repeat'])})
+
+        self.stdout.write(
+            f"{'sessions':<15}  {'queries/req':>11}  {'auth queries/req':>16}  {'writes/req':>10}  "
+            f"{'p50 ms':>8}  {'p95 ms':>8}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['sessions']:<15}  {row['queries_per_request']:>11.2f}  {row['auth_queries_per_request']:>16.2f}  "
+                f"{row['writes_per_request']:>10.2f}  {row['p50_ms']:>8.1f}  {row['p95_ms']:>8.1f}"
+            )
@@ -0,0 +1,43 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+
+from olympics.reports import render_pdf
+
+HEADINGS = ["Name", "Country", "Sport", "Height", "Weight"]
+
+
+def sample_rows(count):
+    # Shaped like the athlete export, which is the largest PDF the app produces
+    return [
+        (f"ATHLETE{i} Given Name", "United States", "['Athletics']", 170.0 + i % 30, 60.0 + i % 40)
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Time the ReportLab and xhtml2pdf PDF engines on tables of increasing size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--engines', nargs='+', default=['reportlab', 'xhtml2pdf'],
+                            choices=['reportlab', 'xhtml2pdf'])
+        parser.add_argument('--html-max-rows', type=int, default=10000,
+                            help='Skip xhtml2pdf above this many rows, since it scales super-linearly '
+                                 '(0 = no limit, default: %(default)s).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>8}  {'engine':<10}  {'seconds':>8}  {'rows/sec':>9}  {'size':>10}")
+        for count in options['rows']:
+            rows = sample_rows(count)
+            for engine in options['engines']:
+                if engine == 'xhtml2pdf' and 0 < options['html_max_rows'] < count:
+                    self.stdout.write(f"{count:>8}  {engine:<10}  skipped (--html-max-rows)")
+                    continue
+                buf = io.BytesIO()
+                started = time.perf_counter()
+                ok = render_pdf("Filtered Athletes List", HEADINGS, rows, buf, engine=engine)
+                elapsed = time.perf_counter() - started
+                status = f"{len(buf.getvalue()):>10,}" if ok else '    failed'
+                self.stdout.write(f"{count:>8}  {engine:<10}  {elapsed:>8.2f}  {count / elapsed:>9,.0f}  {status}")
@@ -0,0 +1,92 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from olympics import import_data
+
+IMPORTERS = {
+    'athletes': (import_data.import_athletes, 'athletes.csv'),
+    'events': (import_data.import_events, 'events.csv'),
+    'medals': (import_data.import_medals, 'medals.csv'),
+}
+SYNCERS = {
+    'athletes': import_data.sync_athletes,
+    'events': import_data.sync_events,
+    'medals': import_data.sync_medals,
+}
+
+
+class Command(BaseCommand):
+    help = 'Load the Paris 2024 CSV files from the data folder into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help=f"Tables to import: {', '.join(IMPORTERS)} (default: all).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=import_data.BATCH_SIZE,
+            help='Rows per bulk INSERT (default: %(default)s).',
+        )
+        parser.add_argument(
+            '--data-dir', default=import_data.DATA_FOLDER,
+            help='Folder containing the CSV files (default: %(default)s).',
+        )
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Update and delete as well as insert, so the tables match the CSV files; '
+                 'only rows whose values changed are written.',
+        )
+        parser.add_argument(
+            '--rejects', default='medals_rejects.csv',
+            help='Where to write medal rows that could not be linked (default: %(default)s).',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(IMPORTERS)
+        if unknown:
+            raise CommandError(f"Unknown table(s): {', '.join(sorted(unknown))}")
+
+        self.sync = options['sync']
+        # Medals reference athletes and events, so always load in dependency order
+        tables = [table for table in IMPORTERS if table in (options['tables'] or IMPORTERS)]
+
+        with transaction.atomic():
+            for table in tables:
+                importer, file_name = IMPORTERS[table]
+                if options['sync']:
+                    importer = SYNCERS[table]
+                if not os.path.exists(os.path.join(options['data_dir'], file_name)):
+                    self.stderr.write(self.style.WARNING(f"{table}: {file_name} not found, skipping."))
+                    continue
+
+                started = time.perf_counter()
+                kwargs = {'data_folder': options['data_dir'], 'batch_size': options['batch_size']}
+                if table == 'medals':
+                    kwargs['rejects_path'] = options['rejects']
+                try:
+                    result = importer(**kwargs)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                elapsed = time.perf_counter() - started
+                self.report(result, elapsed)
+                if result.rejected:
+                    self.report_rejects(result, options['rejects'])
+
+    def report(self, result, elapsed):
+        rate = result.read / elapsed if elapsed else 0
+        changes = f"{result.created} created"
+        if self.sync:
+            changes += f", {result.updated} updated, {result.deleted} deleted, {result.unchanged} unchanged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.table}: {result.read} rows read, {changes} "
+            f"in {elapsed:.2f}s ({rate:,.0f} rows/sec)"
+        ))
+
+    def report_rejects(self, result, rejects_path):
+        reasons = ', '.join(f"{count} {reason}" for reason, count in result.reasons.items())
+        self.stderr.write(self.style.WARNING(
+            f"{result.table}: {result.rejected} rows rejected ({reasons}), written to {rejects_path}"
+        ))
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import Count, F
+
+from olympics.models import Athlete, DataVersion, Discipline, Medal
+from olympics.perf import percentile
+
+
+def add_alias(alias, name, options=None, conn_max_age=0):
+    # Register an extra connection at runtime, with Django's defaults filled in
+    config = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name, 'OPTIONS': options or {},
+              'CONN_MAX_AGE': conn_max_age}
+    connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, alias: config})[alias]
+
+
+def copy_database(source, dest, journal_mode):
+    # The backup API gives a consistent copy even while the source is in WAL mode
+    src, dst = sqlite3.connect(source), sqlite3.connect(dest)
+    with dst:
+        src.backup(dst)
+    dst.execute(f"PRAGMA journal_mode={journal_mode}")
+    src.close()
+    dst.close()
+
+
+def read_once(alias, sport):
+    # The queries behind an athletes page, the standings and the home page's snapshot version check
+    athletes = Athlete.objects.using(alias).filter(disciplines__name=sport)
+    list(athletes.order_by('id').values('id', 'name', 'country')[:24])
+    athletes.count()
+    list(Medal.objects.using(alias).values('noc_id').annotate(total=Count('id')).order_by('-total')[:10])
+    list(DataVersion.objects.using(alias).values_list('table', 'version', 'updated_at'))
+
+
+def write_once(alias, ids, serial):
+    # An import-sized write transaction: rewrite a batch of rows and the data version
+    with transaction.atomic(using=alias):
+        Athlete.objects.using(alias).filter(id__in=ids).update(coach=f"Load test {serial}")
+        DataVersion.objects.using(alias).filter(table='olympics.athlete').update(version=F('version') + 1)
+
+
+class Command(BaseCommand):
+    help = ('Load-test a copy of the database with concurrent dashboard readers and one writer, '
+            'under the default SQLite settings and under the production profile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads (default: %(default)s).')
+        parser.add_argument('--seconds', type=float, default=5, help='Duration per profile (default: %(default)s).')
+        parser.add_argument('--write-rows', type=int, default=2000,
+                            help='Rows updated per write transaction (default: %(default)s).')
+        parser.add_argument('--write-pause', type=float, default=0.05,
+                            help='Seconds between write transactions (default: %(default)s).')
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The load test compares SQLite configurations.')
+        sport = Discipline.objects.values_list('name', flat=True).first()
+        if sport is None:
+            raise CommandError('Load some data first (python manage.py import_olympics).')
+        ids = list(Athlete.objects.order_by('id').values_list('id', flat=True)[:options['write_rows']])
+
+        with tempfile.TemporaryDirectory(prefix='olympics-loadtest-') as workdir:
+            baseline = os.path.join(workdir, 'baseline.sqlite3')
+            tuned = os.path.join(workdir, 'production.sqlite3')
+            copy_database(str(source['NAME']), baseline, 'DELETE')
+            copy_database(str(source['NAME']), tuned, 'WAL')
+
+            # Default settings: rollback journal, new connection per request, readers and writer share it
+            add_alias('loadtest_baseline', baseline)
+            # The production profile: WAL PRAGMAs, persistent connections, a mode=ro reader connection
+            add_alias('loadtest_primary', tuned, conn_max_age=600, options={
+                'init_command': settings.SQLITE_INIT_COMMAND, 'timeout': 20, 'transaction_mode': 'IMMEDIATE',
+            })
+            add_alias('loadtest_replica', f"file:{tuned}?mode=ro", conn_max_age=600, options={
+                'init_command': settings.SQLITE_READ_INIT_COMMAND, 'timeout': 20,
+            })
+
+            results = [
+                self.run_profile('default', 'loadtest_baseline', 'loadtest_baseline', sport, ids, False, options),
+                self.run_profile('production', 'loadtest_replica', 'loadtest_primary', sport, ids, True, options),
+            ]
+
+        self.stdout.write(
+            f"{'profile':<11}  {'reads/sec':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+            f"{'read errors':>11}  {'writes':>6}  {'write errors':>12}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['profile']:<11}  {row['reads_per_sec']:>9.1f}  {row['p50_ms']:>8.1f}  {row['p95_ms']:>8.1f}  "
+                f"{row['p99_ms']:>8.1f}  {row['read_errors']:>11}  {row['writes']:>6}  {row['write_errors']:>12}"
+            )
+
+    def run_profile(self, profile, read_alias, write_alias, sport, ids, persistent, options):
+        self.stderr.write(f"Running the {profile} profile for {options['seconds']:g}s")
+        deadline = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        latencies = []
+        counts = {'read_errors': 0, 'writes': 0, 'write_errors': 0}
+
+        def reader():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    read_once(read_alias, sport)
+                except OperationalError:
+                    with lock:
+                        counts['read_errors'] += 1
+                else:
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                if not persistent:
+                    connections[read_alias].close()
+            connections.close_all()
+
+        def writer():
+            while time.monotonic() < deadline:
+                try:
+                    write_once(write_alias, ids, counts['writes'])
+                except OperationalError:
+                    counts['write_errors'] += 1
+                else:
+                    counts['writes'] += 1
+                if not persistent:
+                    connections[write_alias].close()
+                time.sleep(options['write_pause'])
+            connections.close_all()
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(latency * 1000 for latency in latencies)
+        return {
+            'profile': profile,
+            'reads_per_sec': len(latencies) / options['seconds'],
+            'p50_ms': percentile(latencies, 50) or 0,
+            'p95_ms': percentile(latencies, 95) or 0,
+            'p99_ms': percentile(latencies, 99) or 0,
+            **counts,
+        }
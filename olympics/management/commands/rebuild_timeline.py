@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from olympics import timeline
+from olympics.models import MedalDay
+
+
+class Command(BaseCommand):
+    help = 'Recompute the medal timeline (daily medals and running totals per country) from the medal table.'
+
+    def handle(self, *args, **options):
+        timeline.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Medal timeline rebuilt: {MedalDay.objects.count()} country-days."))
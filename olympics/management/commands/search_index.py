@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from olympics import search
+
+
+class Command(BaseCommand):
+    help = 'Build (or drop) the SQLite FTS5 index used for athlete search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop', action='store_true', help='Remove the index and its triggers.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The FTS5 search index is only available on SQLite.')
+
+        if options['drop']:
+            search.drop_index()
+            self.stdout.write(self.style.SUCCESS('Athlete search index dropped.'))
+            return
+
+        search.create_index()
+        self.stdout.write(self.style.SUCCESS(
+            "Athlete search index built. Set ATHLETE_SEARCH_BACKEND = 'fts5' to use it."
+        ))
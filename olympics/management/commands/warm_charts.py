@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from olympics import charts
+
+
+class Command(BaseCommand):
+    help = 'Pre-render every dashboard chart for the current data into CHART_CACHE_DIR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('charts', nargs='*', help=f"Charts to render: {', '.join(charts.CHARTS)} (default: all).")
+
+    def handle(self, *args, **options):
+        if not charts.CHART_CACHE_DIR:
+            raise CommandError('Set CHART_CACHE_DIR in settings to pre-render charts to disk.')
+        unknown = set(options['charts']) - set(charts.CHARTS)
+        if unknown:
+            raise CommandError(f"Unknown chart(s): {', '.join(sorted(unknown))}")
+
+        for name in options['charts'] or charts.CHARTS:
+            # write_chart() also removes the renders of older data
+            data = charts.chart_data(name)
+            path = charts.write_chart(name, data, charts.render_chart(name, data))
+            self.stdout.write(self.style.SUCCESS(f"{name}: {path}"))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0003_dataversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='athlete',
+            name='country',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='athlete',
+            name='sport',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='sport',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='sport_code',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='medal',
+            name='country',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='medal',
+            name='medal_type',
+            field=models.CharField(blank=True, db_index=True, max_length=10, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+def backfill_medal_code(apps, schema_editor):
+    Medal = apps.get_model('olympics', 'Medal')
+    for code, prefix in [(1, 'gold'), (2, 'silver'), (3, 'bronze')]:
+        Medal.objects.filter(medal_type__istartswith=prefix).update(medal_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0005_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medal',
+            name='medal_code',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Gold Medal'), (2, 'Silver Medal'), (3, 'Bronze Medal')], db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='medal',
+            name='medal_type',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_medal_code, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0006_medal_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='athlete',
+            name='code',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='athlete',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='medal',
+            name='code',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='medal',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0007_source_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Discipline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='athlete',
+            name='sport',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddField(
+            model_name='athlete',
+            name='disciplines',
+            field=models.ManyToManyField(blank=True, related_name='athletes', to='olympics.discipline'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:03
+
+import ast
+
+from django.db import migrations
+
+
+def _names(value):
+    # "['Marathon Swimming', 'Swimming']" -> ['Marathon Swimming', 'Swimming']; plain names stay as they are
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        parsed = value
+    names = parsed if isinstance(parsed, (list, tuple)) else [parsed]
+    return [str(name).strip() for name in names if name and str(name).strip()]
+
+
+def split_sports(apps, schema_editor):
+    Athlete = apps.get_model('olympics', 'Athlete')
+    Discipline = apps.get_model('olympics', 'Discipline')
+    Link = Athlete.disciplines.through
+
+    athletes = list(Athlete.objects.only('id', 'sport'))
+    names = {athlete.id: _names(athlete.sport) for athlete in athletes}
+    Discipline.objects.bulk_create(
+        [Discipline(name=name) for name in sorted({name for row in names.values() for name in row})],
+        ignore_conflicts=True,
+    )
+    ids = dict(Discipline.objects.values_list('name', 'id'))
+    Link.objects.bulk_create(
+        [Link(athlete_id=athlete_id, discipline_id=ids[name]) for athlete_id, row in names.items() for name in row],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    for athlete in athletes:
+        athlete.sport = ', '.join(names[athlete.id])
+    Athlete.objects.bulk_update(athletes, ['sport'], batch_size=1000)
+
+
+def join_sports(apps, schema_editor):
+    # Back to the stringified lists the CSV import used to store
+    Athlete = apps.get_model('olympics', 'Athlete')
+    athletes = list(Athlete.objects.only('id', 'sport'))
+    for athlete in athletes:
+        athlete.sport = str(athlete.sport.split(', ') if athlete.sport else [])
+    Athlete.objects.bulk_update(athletes, ['sport'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0008_discipline'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_sports, join_sports),
+    ]
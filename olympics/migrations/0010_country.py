@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0009_split_athlete_sports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=3, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('long_name', models.CharField(blank=True, default='', max_length=255)),
+            ],
+            options={
+                'verbose_name_plural': 'countries',
+            },
+        ),
+        migrations.AddField(
+            model_name='athlete',
+            name='noc',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='athletes', to='olympics.country'),
+        ),
+        migrations.AddField(
+            model_name='medal',
+            name='noc',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='medals', to='olympics.country'),
+        ),
+    ]
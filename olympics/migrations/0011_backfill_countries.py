@@ -0,0 +1,109 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:20
+
+import csv
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+# NOC code for every country name in the shipped data (the names both CSV files use)
+NOC_CODES = {
+    'AIN': 'AIN', 'Afghanistan': 'AFG', 'Albania': 'ALB', 'Algeria': 'ALG', 'American Samoa': 'ASA',
+    'Andorra': 'AND', 'Angola': 'ANG', 'Antigua and Barbuda': 'ANT', 'Argentina': 'ARG', 'Armenia': 'ARM',
+    'Aruba': 'ARU', 'Australia': 'AUS', 'Austria': 'AUT', 'Azerbaijan': 'AZE', 'Bahamas': 'BAH',
+    'Bahrain': 'BRN', 'Bangladesh': 'BAN', 'Barbados': 'BAR', 'Belgium': 'BEL', 'Belize': 'BIZ',
+    'Benin': 'BEN', 'Bermuda': 'BER', 'Bhutan': 'BHU', 'Bolivia': 'BOL', 'Bosnia & Herzegovina': 'BIH',
+    'Botswana': 'BOT', 'Brazil': 'BRA', 'Brunei Darussalam': 'BRU', 'Bulgaria': 'BUL', 'Burkina Faso': 'BUR',
+    'Burundi': 'BDI', 'Cabo Verde': 'CPV', 'Cambodia': 'CAM', 'Cameroon': 'CMR', 'Canada': 'CAN',
+    'Cayman Islands': 'CAY', 'Centr Afric Re': 'CAF', 'Chad': 'CHA', 'Chile': 'CHI', 'China': 'CHN',
+    'Chinese Taipei': 'TPE', 'Colombia': 'COL', 'Comoros': 'COM', 'Congo': 'CGO', 'Cook Islands': 'COK',
+    'Costa Rica': 'CRC', 'Croatia': 'CRO', 'Cuba': 'CUB', 'Cyprus': 'CYP', 'Czechia': 'CZE',
+    "Côte d'Ivoire": 'CIV', 'DPR Korea': 'PRK', 'DR Congo': 'COD', 'Denmark': 'DEN', 'Djibouti': 'DJI',
+    'Dominica': 'DMA', 'Dominican Republic': 'DOM', 'EOR': 'EOR', 'Ecuador': 'ECU', 'Egypt': 'EGY',
+    'El Salvador': 'ESA', 'Equatorial Guinea': 'GEQ', 'Eritrea': 'ERI', 'Estonia': 'EST', 'Eswatini': 'SWZ',
+    'Ethiopia': 'ETH', 'Fiji': 'FIJ', 'Finland': 'FIN', 'France': 'FRA', 'Gabon': 'GAB',
+    'Gambia': 'GAM', 'Georgia': 'GEO', 'Germany': 'GER', 'Ghana': 'GHA', 'Great Britain': 'GBR',
+    'Greece': 'GRE', 'Grenada': 'GRN', 'Guam': 'GUM', 'Guatemala': 'GUA', 'Guinea': 'GUI',
+    'Guinea-Bissau': 'GBS', 'Guyana': 'GUY', 'Haiti': 'HAI', 'Honduras': 'HON', 'Hong Kong, China': 'HKG',
+    'Hungary': 'HUN', 'IR Iran': 'IRI', 'Iceland': 'ISL', 'India': 'IND', 'Indonesia': 'INA',
+    'Iraq': 'IRQ', 'Ireland': 'IRL', 'Israel': 'ISR', 'Italy': 'ITA', 'Jamaica': 'JAM',
+    'Japan': 'JPN', 'Jordan': 'JOR', 'Kazakhstan': 'KAZ', 'Kenya': 'KEN', 'Kiribati': 'KIR',
+    'Korea': 'KOR', 'Kosovo': 'KOS', 'Kuwait': 'KUW', 'Kyrgyzstan': 'KGZ', 'Lao PDR': 'LAO',
+    'Latvia': 'LAT', 'Lebanon': 'LBN', 'Lesotho': 'LES', 'Liberia': 'LBR', 'Libya': 'LBA',
+    'Liechtenstein': 'LIE', 'Lithuania': 'LTU', 'Luxembourg': 'LUX', 'Madagascar': 'MAD', 'Malawi': 'MAW',
+    'Malaysia': 'MAS', 'Maldives': 'MDV', 'Mali': 'MLI', 'Malta': 'MLT', 'Marshall Islands': 'MHL',
+    'Mauritania': 'MTN', 'Mauritius': 'MRI', 'Mexico': 'MEX', 'Micronesia': 'FSM', 'Monaco': 'MON',
+    'Mongolia': 'MGL', 'Montenegro': 'MNE', 'Morocco': 'MAR', 'Mozambique': 'MOZ', 'Myanmar': 'MYA',
+    'Namibia': 'NAM', 'Nauru': 'NRU', 'Nepal': 'NEP', 'Netherlands': 'NED', 'New Zealand': 'NZL',
+    'Nicaragua': 'NCA', 'Niger': 'NIG', 'Nigeria': 'NGR', 'North Macedonia': 'MKD', 'Norway': 'NOR',
+    'Oman': 'OMA', 'Pakistan': 'PAK', 'Palau': 'PLW', 'Palestine': 'PLE', 'Panama': 'PAN',
+    'Papua New Guinea': 'PNG', 'Paraguay': 'PAR', 'Peru': 'PER', 'Philippines': 'PHI', 'Poland': 'POL',
+    'Portugal': 'POR', 'Puerto Rico': 'PUR', 'Qatar': 'QAT', 'Republic of Moldova': 'MDA', 'Romania': 'ROU',
+    'Rwanda': 'RWA', 'Saint Lucia': 'LCA', 'Samoa': 'SAM', 'San Marino': 'SMR', 'Sao Tome & Principe': 'STP',
+    'Saudi Arabia': 'KSA', 'Senegal': 'SEN', 'Serbia': 'SRB', 'Seychelles': 'SEY', 'Sierra Leone': 'SLE',
+    'Singapore': 'SGP', 'Slovakia': 'SVK', 'Slovenia': 'SLO', 'Solomon Islands': 'SOL', 'Somalia': 'SOM',
+    'South Africa': 'RSA', 'South Sudan': 'SSD', 'Spain': 'ESP', 'Sri Lanka': 'SRI', 'St Kitts and Nevis': 'SKN',
+    'StVincent&Grenadines': 'VIN', 'Sudan': 'SUD', 'Suriname': 'SUR', 'Sweden': 'SWE', 'Switzerland': 'SUI',
+    'Syria': 'SYR', 'Tajikistan': 'TJK', 'Tanzania': 'TAN', 'Thailand': 'THA', 'Timor-Leste': 'TLS',
+    'Togo': 'TOG', 'Tonga': 'TGA', 'Trinidad and Tobago': 'TTO', 'Tunisia': 'TUN', 'Turkmenistan': 'TKM',
+    'Tuvalu': 'TUV', 'Türkiye': 'TUR', 'UA Emirates': 'UAE', 'Uganda': 'UGA', 'Ukraine': 'UKR',
+    'United States': 'USA', 'Uruguay': 'URU', 'Uzbekistan': 'UZB', 'Vanuatu': 'VAN', 'Venezuela': 'VEN',
+    'Vietnam': 'VIE', 'Virgin Islands, B': 'IVB', 'Virgin Islands, US': 'ISV', 'Yemen': 'YEM', 'Zambia': 'ZAM',
+    'Zimbabwe': 'ZIM',
+}
+
+# Long names (and codes for any name missing above) are read from these files when they are in data/:
+# file -> long name column. Both spell the short name `country`, as in the athlete and medal rows.
+SOURCES = {
+    'medals.csv': 'country_long',
+    'athletes.csv': 'country_full',
+}
+
+
+def read_countries(data_folder):
+    """{country name: (NOC code, long name)} from whichever source files are present."""
+    countries = {}
+    for file_name, long_column in SOURCES.items():
+        path = os.path.join(data_folder, file_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as fh:
+            for row in csv.DictReader(fh):
+                name, code = (row.get('country') or '').strip(), (row.get('country_code') or '').strip()
+                if name and code:
+                    countries.setdefault(name, (code, (row.get(long_column) or '').strip()))
+    return countries
+
+
+def backfill_countries(apps, schema_editor):
+    Athlete = apps.get_model('olympics', 'Athlete')
+    Medal = apps.get_model('olympics', 'Medal')
+    Country = apps.get_model('olympics', 'Country')
+
+    names = set(Athlete.objects.values_list('country', flat=True)) | set(Medal.objects.values_list('country', flat=True))
+    names.discard(None)
+    names.discard('')
+    countries = {name: (code, '') for name, code in NOC_CODES.items()}
+    countries.update(read_countries(os.path.join(settings.BASE_DIR, 'data')))
+    Country.objects.bulk_create(
+        [
+            Country(code=countries[name][0], name=name, long_name=countries[name][1])
+            for name in sorted(names) if name in countries
+        ],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per country and table; names without a known code keep a null key for `import_olympics --sync`
+    for country_id, name in Country.objects.values_list('id', 'name'):
+        Athlete.objects.filter(country=name).update(noc_id=country_id)
+        Medal.objects.filter(country=name).update(noc_id=country_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0010_country'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_countries, migrations.RunPython.noop),
+    ]
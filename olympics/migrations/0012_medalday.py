@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0011_backfill_countries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedalDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('medals', models.IntegerField(default=0)),
+                ('cumulative', models.IntegerField(default=0)),
+                ('noc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medal_days', to='olympics.country')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='medal_day_day')],
+                'constraints': [models.UniqueConstraint(fields=('noc', 'day'), name='unique_medal_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:15
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_medal_days(apps, schema_editor):
+    Medal = apps.get_model('olympics', 'Medal')
+    MedalDay = apps.get_model('olympics', 'MedalDay')
+
+    rows = (
+        Medal.objects.filter(medal_date__isnull=False, noc__isnull=False)
+        .values('noc_id', 'medal_date').annotate(count=Count('id')).order_by('noc_id', 'medal_date')
+    )
+    running = {}
+    days = []
+    for row in rows:
+        running[row['noc_id']] = running.get(row['noc_id'], 0) + row['count']
+        days.append(MedalDay(
+            noc_id=row['noc_id'], day=row['medal_date'], medals=row['count'], cumulative=running[row['noc_id']],
+        ))
+    MedalDay.objects.bulk_create(days)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympics', '0012_medalday'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_medal_days, migrations.RunPython.noop),
+    ]
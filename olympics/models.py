@@ -1,33 +1,157 @@
+import uuid
+
 from django.db import models
 
+class Country(models.Model):
+    # One row per National Olympic Committee, as medals.csv and athletes.csv `country_code`
+    code = models.CharField(max_length=3, unique=True)  # e.g. "FRA"; also "AIN" and "EOR"
+    name = models.CharField(max_length=100)  # e.g. "France"
+    long_name = models.CharField(max_length=255, blank=True, default='')  # medals.csv `country_long`
+
+    class Meta:
+        verbose_name_plural = 'countries'
+
+    def __str__(self):
+        return self.name
+
+
+class Discipline(models.Model):
+    # One row per sport in athletes.csv `disciplines`, e.g. "Marathon Swimming"
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Athlete(models.Model):
+    code = models.CharField(max_length=20, null=True, blank=True, unique=True)  # athletes.csv `code`
     name = models.CharField(max_length=255)
-    country = models.CharField(max_length=100)
-    sport = models.CharField(max_length=100)
+    country = models.CharField(max_length=100, db_index=True)
+    # Counts and joins by country use this key rather than the free-text name
+    noc = models.ForeignKey(Country, on_delete=models.PROTECT, null=True, blank=True, related_name='athletes')
+    # Display label, e.g. "Marathon Swimming, Swimming"; filters and counts use `disciplines`
+    sport = models.CharField(max_length=255)
+    disciplines = models.ManyToManyField(Discipline, related_name='athletes', blank=True)
     birth_date = models.DateField(null=True, blank=True)
     birth_place = models.CharField(max_length=255, null=True, blank=True)
     height = models.FloatField(null=True, blank=True)
     weight = models.FloatField(null=True, blank=True)
     coach = models.CharField(max_length=255, null=True, blank=True)
+    # Hash of the source row, so a sync only rewrites rows whose CSV values changed
+    row_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
 
     def __str__(self):
         return self.name
 
 class Event(models.Model):
     name = models.CharField(max_length=255)
-    sport = models.CharField(max_length=100)
-    sport_code = models.CharField(max_length=20, null=True, blank=True)  # Allow null
+    sport = models.CharField(max_length=100, db_index=True)
+    sport_code = models.CharField(max_length=20, null=True, blank=True, db_index=True)  # Allow null
+    row_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
 
     def __str__(self):
         return self.name 
 
+class MedalType(models.IntegerChoices):
+    # Codes match the medal_code column of data/medals.csv
+    GOLD = 1, 'Gold Medal'
+    SILVER = 2, 'Silver Medal'
+    BRONZE = 3, 'Bronze Medal'
+
+    @classmethod
+    def from_label(cls, label):
+        # "Gold Medal" or just "Gold" -> MedalType.GOLD; a blank label is no medal type, not a prefix of every one
+        label = label.strip().lower() if isinstance(label, str) else ''
+        if not label:
+            return None
+        for member in cls:
+            if member.label.lower().startswith(label):
+                return member
+        return None
+
+
 class Medal(models.Model):
-    medal_type = models.CharField(max_length=10, null=True, blank=True)  # Allow null
+    medal_type = models.CharField(max_length=20, null=True, blank=True, db_index=True)  # Allow null
+    medal_code = models.PositiveSmallIntegerField(choices=MedalType.choices, null=True, blank=True, db_index=True)
     medal_date = models.DateField(null=True, blank=True)  # Allow null
     athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, null=True, blank=True)
     discipline = models.CharField(max_length=255, null=True, blank=True)  # Allow null
     event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True)
-    country = models.CharField(max_length=100, null=True, blank=True)  # Allow null
+    country = models.CharField(max_length=100, null=True, blank=True, db_index=True)  # Allow null
+    noc = models.ForeignKey(Country, on_delete=models.PROTECT, null=True, blank=True, related_name='medals')
+    code = models.CharField(max_length=20, null=True, blank=True)  # Athlete or team code from medals.csv
+    row_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    def save(self, *args, **kwargs):
+        # The integer code follows the display label on every save; a medal given only a code gets its label
+        if self.medal_type:
+            self.medal_code = MedalType.from_label(self.medal_type)
+        elif self.medal_code is not None:
+            self.medal_type = MedalType(self.medal_code).label
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'medal_type', 'medal_code'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'medal_type', 'medal_code'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        # Use the athlete only if it was loaded with the medal, so listing medals never queries per row
+        if self.athlete_id is None:
+            athlete = 'Unknown'
+        elif Medal.athlete.is_cached(self):
+            athlete = self.athlete.name
+        else:
+            athlete = f"Athlete #{self.athlete_id}"
+        return f"{athlete} - {self.medal_type}"
+
+class DataVersion(models.Model):
+    # Bumped whenever rows of `table` change; cached results are keyed on it
+    table = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+class ExportJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=20)  # 'athletes', 'events' or 'medals'
+    params = models.JSONField(default=dict)  # Filters the report was requested with
+    fingerprint = models.CharField(max_length=40, db_index=True)  # Report + filters + data version
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file = models.CharField(max_length=255, blank=True)  # Path relative to EXPORT_ROOT
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report} PDF ({self.status})"
+
+class MedalDay(models.Model):
+    # Medals per country per competition day with a running total, kept up to date by olympics/timeline.py
+    noc = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='medal_days')
+    day = models.DateField()
+    medals = models.IntegerField(default=0)  # Won on `day`
+    cumulative = models.IntegerField(default=0)  # Won up to and including `day`
+
+    class Meta:
+        constraints = [
+            # Also the index for "this country's days after X" when an earlier day changes
+            models.UniqueConstraint(fields=['noc', 'day'], name='unique_medal_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='medal_day_day'),
+        ]
 
     def __str__(self):
-        return f"{self.athlete.name if self.athlete else 'Unknown'} - {self.medal_type}"
+        return f"{self.noc_id} {self.day}: {self.medals} ({self.cumulative})"
@@ -0,0 +1,125 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_SIZE = getattr(settings, 'PAGE_SIZE', 24)
+MAX_PAGE_SIZE = getattr(settings, 'MAX_PAGE_SIZE', 96)
+
+# Query parameters that move between pages rather than change the result set
+CURSOR_PARAMS = ('after', 'before', 'page_size')
+
+
+def _row_id(row):
+    # Pages hold model instances or, for values() querysets, dicts
+    return row['id'] if isinstance(row, dict) else row.id
+
+
+class KeysetPage:
+    """One page of a queryset walked in `id` order with `after`/`before` cursors."""
+
+    def __init__(self, object_list, page_size, total_count, has_next, has_previous, querystring):
+        self.object_list = object_list
+        self.page_size = page_size
+        self.total_count = total_count
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.querystring = querystring
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return _row_id(self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return _row_id(self.object_list[0]) if self.has_previous else None
+
+    def next_url(self):
+        return self._url(after=self.next_cursor)
+
+    def previous_url(self):
+        return self._url(before=self.previous_cursor)
+
+    def _url(self, **cursor):
+        params = f"{self.querystring}&" if self.querystring else ''
+        return f"?{params}{urlencode({**cursor, 'page_size': self.page_size})}"
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def _get_cursor(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def filter_params(request):
+    # The query string without the cursor, in a stable order
+    return sorted((key, value) for key, value in request.GET.items() if key not in CURSOR_PARAMS and value)
+
+
+def cached_count(queryset, spec):
+    # Counts only change when the data does, so key them on the filter spec and data version
+    return cache.get_or_set(spec.cache_key('count'), queryset.count)
+
+
+async def acached_count(queryset, spec):
+    key = await spec.acache_key('count')
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count)
+    return count
+
+
+def _seek(request, queryset):
+    # The query for one more row than the page holds, so the extra row tells whether there is a next page
+    page_size = get_page_size(request)
+    after = _get_cursor(request, 'after')
+    before = _get_cursor(request, 'before')
+    if before is not None:
+        return queryset.filter(id__lt=before).order_by('-id')[:page_size + 1], page_size, after, before
+    seek = queryset.filter(id__gt=after) if after is not None else queryset
+    return seek.order_by('id')[:page_size + 1], page_size, after, before
+
+
+def _make_page(request, rows, page_size, after, before, total_count):
+    if before is not None:
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = bool(rows)
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None and bool(rows)
+    return KeysetPage(rows, page_size, total_count, has_next, has_previous, urlencode(filter_params(request)))
+
+
+def paginate(request, queryset, spec):
+    """Return the page of `queryset` (filtered by `spec`) selected by the request's cursor.
+
+    Pages seek on the primary key (WHERE id > cursor) instead of using
+    OFFSET, so a deep page costs the same as the first one.
+    """
+    query, page_size, after, before = _seek(request, queryset)
+    return _make_page(request, list(query), page_size, after, before, cached_count(queryset, spec))
+
+
+async def apaginate(request, queryset, spec):
+    """paginate() for async views, using the async ORM."""
+    query, page_size, after, before = _seek(request, queryset)
+    rows = [row async for row in query]
+    return _make_page(request, rows, page_size, after, before, await acached_count(queryset, spec))
@@ -0,0 +1,191 @@
+import io
+import os
+
+from django.conf import settings
+from pypdf import PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from .workers import process_pool
+
+# Worker processes used to lay out chunks of a large table in parallel
+PDF_RENDER_PROCESSES = getattr(settings, 'PDF_RENDER_PROCESSES', min(4, os.cpu_count() or 1))
+
+# Pages laid out by each worker; smaller tables are rendered in-process
+PDF_CHUNK_PAGES = getattr(settings, 'PDF_CHUNK_PAGES', 40)
+
+# Matches the look of templates/export_pdf.html
+GOLD = colors.HexColor('#d4af37')
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+FONT_SIZE = 10
+LEADING = FONT_SIZE * 1.2
+CELL_PADDING = 6
+MARGIN = 0.5 * inch
+PAGE_WIDTH = A4[0] - 2 * MARGIN
+
+# No column is measured wider than this share of the page, so one long value cannot squeeze the others
+MAX_COLUMN_SHARE = 0.4
+
+TITLE_STYLE = ParagraphStyle(
+    'Title', fontName=BOLD_FONT, fontSize=24, leading=30, alignment=TA_CENTER,
+    textColor=GOLD, spaceAfter=20,
+)
+TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), FONT),
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('LEADING', (0, 0), (-1, -1), LEADING),
+    ('FONTNAME', (0, 0), (-1, 0), BOLD_FONT),
+    ('BACKGROUND', (0, 0), (-1, 0), GOLD),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+    ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+    ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+])
+
+
+def _frame_height():
+    # Platypus frames keep 6pt of padding inside the page margins
+    return A4[1] - 2 * MARGIN - 12
+
+
+def _title_height(title):
+    _, height = Paragraph(title, TITLE_STYLE).wrap(PAGE_WIDTH, _frame_height())
+    return height + TITLE_STYLE.spaceAfter
+
+
+def _clean(value):
+    return '' if value is None else str(value)
+
+
+def _column_widths(headings, rows):
+    # The widest text in each column over every row (each distinct value measured once),
+    # capped, then the page width shared out in proportion
+    cap = PAGE_WIDTH * MAX_COLUMN_SHARE
+    widest = []
+    for i, heading in enumerate(headings):
+        values = {_clean(row[i]) for row in rows}
+        width = max([stringWidth(value, FONT, FONT_SIZE) for value in values] + [stringWidth(heading, BOLD_FONT, FONT_SIZE)])
+        widest.append(min(width, cap) + 2 * CELL_PADDING)
+    scale = PAGE_WIDTH / sum(widest)
+    return [width * scale for width in widest]
+
+
+def _wrap(text, width, font=FONT):
+    """`text` as lines no wider than `width`: broken between words, and inside a word too long for a line."""
+    if stringWidth(text, font, FONT_SIZE) <= width:
+        return [text]
+    lines = []
+    for line in simpleSplit(text, font, FONT_SIZE, width) or ['']:
+        while len(line) > 1 and stringWidth(line, font, FONT_SIZE) > width:
+            cut = len(line) - 1
+            while cut > 1 and stringWidth(line[:cut], font, FONT_SIZE) > width:
+                cut -= 1
+            lines.append(line[:cut])
+            line = line[cut:]
+        lines.append(line)
+    return lines
+
+
+def _layout_row(values, col_widths, font=FONT):
+    # Cells as newline-joined lines, and the height the tallest of them needs
+    cells = [_wrap(_clean(value), width - 2 * CELL_PADDING, font) for value, width in zip(values, col_widths)]
+    height = max(len(lines) for lines in cells) * LEADING + 2 * CELL_PADDING
+    return ['\n'.join(lines) for lines in cells], height
+
+
+def _pages(title, header_height, heights):
+    """(start, end) row ranges that fill each page, the first page under the title.
+
+    Row heights are known once the text is wrapped, so pages are laid out
+    here rather than by the table splitter, and every chunk starts on a page.
+    """
+    # A point of slack so rounding never pushes a page's last row onto a page of its own
+    available = _frame_height() - (_title_height(title) if title else 0) - header_height - 1
+    pages, start, used = [], 0, 0
+    for index, height in enumerate(heights):
+        if used + height > available and index > start:
+            pages.append((start, index))
+            start, used = index, 0
+            available = _frame_height() - header_height - 1
+        used += height
+    pages.append((start, len(heights)))
+    return pages
+
+
+def render_chunk(title, header, pages):
+    """Lay out a run of pages as a standalone PDF and return its bytes.
+
+    `header` is the laid-out heading row and each page a list of laid-out
+    rows, as (cells, height) pairs; each page is one table.
+    """
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4, leftMargin=MARGIN, rightMargin=MARGIN, topMargin=MARGIN, bottomMargin=MARGIN,
+        title=title or '',
+    )
+    story = [Paragraph(title, TITLE_STYLE)] if title else []
+    header_cells, header_height, col_widths = header
+    for number, rows in enumerate(pages):
+        if number:
+            story.append(PageBreak())
+        table = Table(
+            [header_cells] + [cells for cells, _ in rows],
+            colWidths=col_widths, rowHeights=[header_height] + [height for _, height in rows],
+        )
+        table.setStyle(TABLE_STYLE)
+        story.append(table)
+    doc.build(story)
+    return buf.getvalue()
+
+
+def _chunks(title, rows, pages):
+    # PDF_CHUNK_PAGES whole pages per chunk, so the merged document has no short pages
+    for start in range(0, len(pages), PDF_CHUNK_PAGES):
+        yield (title if start == 0 else None), [rows[first:end] for first, end in pages[start:start + PDF_CHUNK_PAGES]]
+
+
+def render_table_pdf(title, headings, rows, dest, processes=None):
+    """Write `rows` as a titled, gridded table PDF to the file-like `dest`.
+
+    Cell text wraps to its column. Large tables are split into
+    page-aligned chunks that are laid out in parallel worker processes and
+    then concatenated.
+    """
+    rows = [tuple(row) for row in rows]
+    col_widths = _column_widths(headings, rows)
+    header_cells, header_height = _layout_row(headings, col_widths, BOLD_FONT)
+    header = (header_cells, header_height, col_widths)
+    rows = [_layout_row(row, col_widths) for row in rows]
+    pages = _pages(title, header_height, [height for _, height in rows])
+    chunks = list(_chunks(title, rows, pages))
+    processes = PDF_RENDER_PROCESSES if processes is None else processes
+
+    if len(chunks) == 1 or processes <= 1:
+        parts = [render_chunk(chunk_title, header, chunk_pages) for chunk_title, chunk_pages in chunks]
+    else:
+        # Chunks only need ReportLab, so these workers skip Django setup
+        with process_pool(min(processes, len(chunks))) as pool:
+            futures = [
+                pool.submit(render_chunk, chunk_title, header, chunk_pages)
+                for chunk_title, chunk_pages in chunks
+            ]
+            parts = [future.result() for future in futures]
+
+    if len(parts) == 1:
+        dest.write(parts[0])
+        return
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    writer.write(dest)
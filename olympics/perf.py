@@ -0,0 +1,248 @@
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Requests kept in memory for /_perf/ (the oldest are dropped first)
+PERF_BUFFER_SIZE = getattr(settings, 'PERF_BUFFER_SIZE', 1000)
+# Optional JSON-lines file every request record is appended to
+PERF_LOG_FILE = getattr(settings, 'PERF_LOG_FILE', None)
+# A query shape run more often than this in one request is reported as an N+1
+PERF_N_PLUS_ONE_THRESHOLD = getattr(settings, 'PERF_N_PLUS_ONE_THRESHOLD', 5)
+
+# Paths that are never recorded (the report itself, static files)
+IGNORED_PREFIXES = ('/_perf/', '/' + settings.STATIC_URL.lstrip('/'))
+
+_records = deque(maxlen=PERF_BUFFER_SIZE)
+_lock = threading.Lock()
+# A context variable rather than a thread local: under ASGI many requests share the
+# event loop thread, and the value follows each request into sync_to_async threads
+_current = ContextVar('perf_request_stats', default=None)
+
+
+def sql_shape(sql):
+    """The statement with literals and IN-list lengths folded, so repeats compare equal."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    sql = re.sub(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)', '(...)', sql)
+    return sql.replace('%s', '?')
+
+
+class RequestStats:
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Time every statement sent to the database while this request is current
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated_queries(self):
+        return [
+            {'sql': shape, 'count': count}
+            for shape, count in self.shapes.most_common()
+            if count > PERF_N_PLUS_ONE_THRESHOLD
+        ]
+
+
+def current_stats():
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """connection_created receiver: add the statement hook to every new connection.
+
+    The hook goes on the connection that runs the queries, whichever thread
+    that is: under ASGI the ORM runs in sync_to_async threads, each with its
+    own connections, and `_current` follows the request there.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current_stats()
+        if stats is None:
+            return super().render(context, request)
+        # Only the outermost render is timed; nested render_to_string calls are part of it
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each render for PerfMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class PerfMiddleware:
+    """Record wall time, SQL, template time and response size for every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith(IGNORED_PREFIXES):
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if request.path.startswith(IGNORED_PREFIXES):
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    def record(self, request, response, stats, wall_time):
+        match = request.resolver_match
+        record = {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall_time * 1000, 2),
+            'sql_count': stats.sql_count,
+            'sql_ms': round(stats.sql_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            # Streamed bodies are produced after this point, so their size is unknown
+            'bytes': None if response.streaming else len(response.content),
+            'n_plus_one': stats.repeated_queries(),
+        }
+        if record['n_plus_one']:
+            logger.warning(
+                "%s ran the same query %d times: %s",
+                record['view'] or record['path'], record['n_plus_one'][0]['count'], record['n_plus_one'][0]['sql'],
+            )
+        add_record(record)
+        return response
+
+
+def add_record(record):
+    with _lock:
+        _records.append(record)
+        if PERF_LOG_FILE:
+            with open(PERF_LOG_FILE, 'a') as log:
+                log.write(json.dumps(record) + '\n')
+
+
+def records():
+    with _lock:
+        return list(_records)
+
+
+def percentile(values, pct):
+    # Nearest-rank percentile of an already sorted list: the smallest value with pct% of the list at or below it
+    if not values:
+        return None
+    # pct * n before dividing, so 7% of 100 is exactly rank 7 rather than 7.000000000000001
+    index = max(0, min(len(values) - 1, math.ceil(pct * len(values) / 100) - 1))
+    return values[index]
+
+
+def _summary(values):
+    values = sorted(value for value in values if value is not None)
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': values[-1] if values else None,
+    }
+
+
+def summarize(rows):
+    by_view = defaultdict(list)
+    for row in rows:
+        by_view[row['view'] or row['path']].append(row)
+
+    views = []
+    for view, view_rows in by_view.items():
+        views.append({
+            'view': view,
+            'requests': len(view_rows),
+            'wall_ms': _summary(row['wall_ms'] for row in view_rows),
+            'sql_count': _summary(row['sql_count'] for row in view_rows),
+            'sql_ms': _summary(row['sql_ms'] for row in view_rows),
+            'template_ms': _summary(row['template_ms'] for row in view_rows),
+            'bytes': _summary(row['bytes'] for row in view_rows),
+            'n_plus_one_requests': sum(1 for row in view_rows if row['n_plus_one']),
+        })
+    # Slowest views first
+    views.sort(key=lambda item: item['wall_ms']['p95'], reverse=True)
+    return views
+
+
+@staff_member_required
+def perf_report(request):
+    rows = records()
+    return JsonResponse({
+        'requests': len(rows),
+        'buffer_size': PERF_BUFFER_SIZE,
+        'n_plus_one_threshold': PERF_N_PLUS_ONE_THRESHOLD,
+        'views': summarize(rows),
+        'n_plus_one': [
+            {'view': row['view'], 'path': row['path'], 'time': row['time'], 'queries': row['n_plus_one']}
+            for row in [row for row in rows if row['n_plus_one']][-20:]
+        ],
+    })
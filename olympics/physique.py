@@ -0,0 +1,85 @@
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+
+from . import analytics
+from .models import Athlete, Discipline
+from .versions import get_stamp
+
+# Histogram bin edges; values outside them are counted in the first or last bin
+HEIGHT_BINS = np.arange(140, 231, 5)  # cm
+WEIGHT_BINS = np.arange(40, 161, 10)  # kg
+BMI_BINS = np.arange(14, 41, 2)
+# WHO adult BMI classes: upper edge of each
+BMI_CLASSES = [('underweight', 18.5), ('normal', 25), ('overweight', 30), ('obese', np.inf)]
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# Tables the distributions are computed from; sports are matched on discipline names
+PHYSIQUE_MODELS = (Athlete, Discipline)
+
+
+def _distribution(values, bins):
+    counts, _ = np.histogram(np.clip(values, bins[0], bins[-1]), bins=bins)
+    summary = {
+        'count': int(len(values)),
+        'mean': None,
+        'percentiles': {},
+        'histogram': {'bins': bins.tolist(), 'counts': counts.tolist()},
+    }
+    if len(values):
+        summary['mean'] = round(float(values.mean()), 1)
+        summary['percentiles'] = {
+            f"p{p}": round(float(value), 1) for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        }
+    return summary
+
+
+def compute_physique(sport):
+    """Height, weight and BMI distributions of the athletes in `sport` (every athlete if empty).
+
+    Works on the analytics snapshot's columns as whole arrays; 0 is how the
+    CSV spells an unknown height or weight, so those are left out.
+    """
+    snapshot = analytics.get_snapshot()
+    athletes = snapshot.frames['athletes']
+    rows = np.ones(len(athletes), dtype=bool)
+    if sport:
+        links = snapshot.frames['athlete_disciplines']
+        ids = links['athlete_id'].to_numpy()[snapshot.mask('athlete_disciplines', discipline=sport)]
+        rows = np.isin(athletes['id'].to_numpy(), ids)
+
+    height = athletes['height'].to_numpy()[rows]
+    weight = athletes['weight'].to_numpy()[rows]
+    has_height = height > 0  # NaN compares False
+    has_weight = weight > 0
+    both = has_height & has_weight
+    bmi = weight[both] / (height[both] / 100) ** 2
+
+    classes = np.searchsorted([edge for _, edge in BMI_CLASSES], bmi, side='right')
+    bmi_summary = _distribution(bmi, BMI_BINS)
+    bmi_summary['classes'] = dict(zip(
+        (name for name, _ in BMI_CLASSES), np.bincount(classes, minlength=len(BMI_CLASSES)).tolist()
+    ))
+    return {
+        'sport': sport,
+        'athletes': int(rows.sum()),
+        'height': _distribution(height[has_height], HEIGHT_BINS),
+        'weight': _distribution(weight[has_weight], WEIGHT_BINS),
+        'bmi': bmi_summary,
+    }
+
+
+def sport_digest(sport):
+    # Sport names have spaces and accents, which some cache backends reject in keys
+    return hashlib.sha1(sport.encode()).hexdigest()
+
+
+def physique_key(sport, stamp):
+    return f"physique:{stamp.key}:{sport_digest(sport)}"
+
+
+def get_physique(sport, stamp=None):
+    # Cached per sport until an athlete, an athlete's disciplines or a discipline changes
+    stamp = stamp or get_stamp(*PHYSIQUE_MODELS)
+    return cache.get_or_set(physique_key(sport, stamp), lambda: compute_physique(sport))
@@ -0,0 +1,69 @@
+import io
+import logging
+
+from django.conf import settings
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+
+from .pdf import render_table_pdf
+
+logger = logging.getLogger(__name__)
+
+# 'reportlab' lays the table out directly; 'xhtml2pdf' converts templates/export_pdf.html
+PDF_EXPORT_ENGINE = getattr(settings, 'PDF_EXPORT_ENGINE', 'reportlab')
+
+
+def athletes_report(spec):
+    title = "Filtered Athletes List"
+    headings = ["Name", "Country", "Sport", "Height", "Weight"]
+    data = spec.rows('name', 'country', 'sport', 'height', 'weight')
+    return title, headings, data
+
+
+def events_report(spec):
+    title = "Filtered Events List"
+    headings = ["Event Name", "Sport", "Sport Code"]
+    data = spec.rows('name', 'sport', 'sport_code')
+    return title, headings, data
+
+
+def medals_report(spec):
+    title = "Filtered Medals List"
+    headings = ["Athlete", "Country", "Event", "Medal Type"]
+    data = [
+        (athlete_name or "N/A", country, event_name or "N/A", medal_type)
+        for athlete_name, country, event_name, medal_type in spec.rows(
+            'athlete__name', 'country', 'event__name', 'medal_type'
+        )
+    ]
+    return title, headings, data
+
+
+# Report name -> builder; the filter spec for each report is filters.FILTERS[name]
+REPORTS = {
+    'athletes': athletes_report,
+    'events': events_report,
+    'medals': medals_report,
+}
+
+
+def render_html_pdf(title, headings, data, dest):
+    template = get_template('export_pdf.html')
+    html = template.render({'title': title, 'headings': headings, 'data': data})
+    pisa_status = pisa.CreatePDF(html, dest=dest)
+    return not pisa_status.err
+
+
+def render_pdf(title, headings, data, dest, engine=None):
+    engine = engine or PDF_EXPORT_ENGINE
+    if engine == 'reportlab':
+        # Render to memory first so a failure leaves nothing half-written in dest
+        buf = io.BytesIO()
+        try:
+            render_table_pdf(title, headings, data, buf)
+        except Exception:
+            logger.exception("ReportLab rendering of %r failed, falling back to xhtml2pdf", title)
+        else:
+            dest.write(buf.getvalue())
+            return True
+    return render_html_pdf(title, headings, data, dest)
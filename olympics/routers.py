@@ -0,0 +1,35 @@
+from django.db import connections
+
+# Tables behind the dashboard pages, exports and API; written only by imports and signals
+DASHBOARD_MODELS = {
+    'athlete', 'athlete_disciplines', 'country', 'discipline', 'event', 'medal', 'medalday', 'dataversion',
+}
+
+
+class ReadReplicaRouter:
+    """Send dashboard reads to the read-only `replica` connection and everything else to `default`.
+
+    Auth, sessions, export jobs and every write stay on the primary. So
+    do reads made while the primary is inside a transaction (imports,
+    timeline rebuilds), since the replica cannot see uncommitted rows.
+    """
+
+    primary = 'default'
+    replica = 'replica'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'olympics' or model._meta.model_name not in DASHBOARD_MODELS:
+            return self.primary
+        if connections[self.primary].in_atomic_block:
+            return self.primary
+        return self.replica
+
+    def db_for_write(self, model, **hints):
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database file
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.primary
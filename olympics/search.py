@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'olympics_athlete_fts'
+
+# Triggers keep the external-content FTS table in step with every write to
+# olympics_athlete, including bulk_create() and raw SQL, not just Model.save()
+FTS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON olympics_athlete BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, country, sport) VALUES (new.id, new.name, new.country, new.sport);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON olympics_athlete BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, country, sport) VALUES ('delete', old.id, old.name, old.country, old.sport);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON olympics_athlete BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, country, sport) VALUES ('delete', old.id, old.name, old.country, old.sport);
+        INSERT INTO {FTS_TABLE}(rowid, name, country, sport) VALUES (new.id, new.name, new.country, new.sport);
+    END""",
+]
+
+
+def fts_requested():
+    return getattr(settings, 'ATHLETE_SEARCH_BACKEND', 'icontains') == 'fts5' and connection.vendor == 'sqlite'
+
+
+def fts_table_exists():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def create_index():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, country, sport, content='olympics_athlete', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(trigger)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_index():
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def restore_triggers(using='default', **kwargs):
+    # Migrations that rebuild olympics_athlete drop its triggers, so put them back
+    if using == connection.alias and connection.vendor == 'sqlite' and fts_table_exists():
+        create_index()
+
+
+def match_expression(query):
+    # Every word must prefix-match a word of the name or country: "fra" finds "France"
+    terms = ['"{}"*'.format(word.replace('"', '""')) for word in query.split()]
+    return '{name country} : (' + ' AND '.join(terms) + ')'
+
+
+def search_athletes(athletes, query):
+    """Filter `athletes` to those whose name or country matches `query`.
+
+    Uses the FTS5 index when ATHLETE_SEARCH_BACKEND = 'fts5' and the index
+    has been built (manage.py search_index); otherwise falls back to the
+    substring scan.
+    """
+    if fts_requested() and fts_table_exists():
+        return athletes.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match_expression(query)]
+        ))
+    return athletes.filter(Q(name__icontains=query) | Q(country__icontains=query))
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import auth, facets, timeline
+from .models import Athlete, Country, Discipline, Event, Medal
+from .versions import bump_version
+
+
+@receiver(post_save, sender=Athlete)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Medal)
+@receiver(post_save, sender=Country)
+@receiver(post_save, sender=Discipline)
+@receiver(post_delete, sender=Athlete)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Medal)
+@receiver(post_delete, sender=Country)
+@receiver(post_delete, sender=Discipline)
+def data_changed(sender, **kwargs):
+    bump_version(sender)
+    facets.invalidate(sender)
+
+
+@receiver(m2m_changed, sender=Athlete.disciplines.through)
+def disciplines_changed(sender, action, **kwargs):
+    # Sport filters and facets go through the join, so editing it changes athlete results
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        data_changed(Athlete)
+
+
+@receiver(pre_save, sender=Medal)
+def remember_timeline_values(sender, instance, **kwargs):
+    # The timeline needs the day and country being replaced, which post_save can no longer see
+    instance._timeline_values = None
+    if not instance._state.adding:
+        instance._timeline_values = (
+            sender.objects.filter(pk=instance.pk).values(*timeline.TRACKED_FIELDS[sender]).first()
+        )
+
+
+@receiver(post_save, sender=Medal)
+def update_timeline_on_save(sender, instance, created, **kwargs):
+    old_values = None if created else getattr(instance, '_timeline_values', None)
+    timeline.row_changed(sender, old_values, timeline.tracked_values(instance))
+
+
+@receiver(post_delete, sender=Medal)
+def update_timeline_on_delete(sender, instance, **kwargs):
+    timeline.row_changed(sender, timeline.tracked_values(instance), None)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    auth.forget_user(instance.pk)
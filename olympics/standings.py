@@ -0,0 +1,80 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils.dateparse import parse_date
+
+from .models import Country, Medal, MedalType
+from .versions import get_stamp, get_version
+
+STANDINGS_FILTERS = ('discipline', 'date_from', 'date_to')
+
+
+def standings_params(query_dict):
+    # Drop empty and malformed filters so they can't fragment the cache
+    params = {}
+    if query_dict.get('discipline'):
+        params['discipline'] = query_dict['discipline']
+    for name in ('date_from', 'date_to'):
+        try:
+            value = parse_date(query_dict.get(name) or '')
+        except ValueError:
+            value = None
+        if value:
+            params[name] = value.isoformat()
+    return params
+
+
+def compute_standings(params):
+    """Gold/silver/bronze/total per country, in Olympic order, from one GROUP BY query.
+
+    Countries are ranked by golds, then silvers, then bronzes; countries
+    level on all three share a rank.
+    """
+    medals = Medal.objects.all()
+    if 'discipline' in params:
+        medals = medals.filter(discipline=params['discipline'])
+    if 'date_from' in params:
+        medals = medals.filter(medal_date__gte=params['date_from'])
+    if 'date_to' in params:
+        medals = medals.filter(medal_date__lte=params['date_to'])
+
+    # Grouped on the integer country key; the name and code come along from the Country join
+    rows = list(
+        medals.values('noc_id')
+        .annotate(
+            country=F('noc__name'),
+            code=F('noc__code'),
+            gold=Count('id', filter=Q(medal_code=MedalType.GOLD)),
+            silver=Count('id', filter=Q(medal_code=MedalType.SILVER)),
+            bronze=Count('id', filter=Q(medal_code=MedalType.BRONZE)),
+            total=Count('id', filter=Q(medal_code__isnull=False)),
+        )
+        .filter(total__gt=0)
+        .order_by('-gold', '-silver', '-bronze', 'country')
+    )
+
+    previous = None
+    for position, row in enumerate(rows, start=1):
+        del row['noc_id']
+        tally = (row['gold'], row['silver'], row['bronze'])
+        if tally != previous:
+            rank = position
+        row['rank'] = rank
+        previous = tally
+    return rows
+
+
+def get_standings(params):
+    # Cached per filter set until a medal or country row changes
+    digest = hashlib.sha1(urlencode(sorted(params.items())).encode()).hexdigest()
+    key = f"standings:{get_stamp(Medal, Country).key}:{digest}"
+    return cache.get_or_set(key, lambda: compute_standings(params))
+
+
+def get_disciplines():
+    key = f"standings:disciplines:{get_version(Medal)}"
+    return cache.get_or_set(key, lambda: list(
+        Medal.objects.exclude(discipline__isnull=True).values_list('discipline', flat=True).distinct().order_by('discipline')
+    ))
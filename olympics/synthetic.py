@@ -0,0 +1,147 @@
+"""Synthetic Olympics data shaped like data/*.csv, for benchmarks at larger volumes.
+
+The generated files use the same columns as the real ones, so they go
+through olympics.import_data unchanged.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from olympics import charts, jobs
+from olympics.import_data import DATA_FOLDER, TEAM_EVENT_TYPES
+from olympics.models import Athlete, Event, Medal
+
+SOURCES = {
+    'athletes': ('athletes.csv', Athlete),
+    'events': ('events.csv', Event),
+    'medals': ('medals.csv', Medal),
+}
+
+SYLLABLES = [
+    'an', 'ber', 'cha', 'dor', 'el', 'fi', 'ga', 'hin', 'is', 'jo', 'ka', 'lun', 'mar', 'no', 'ol',
+    'pe', 'qui', 'ro', 'sa', 'tel', 'u', 'va', 'wen', 'xi', 'ya', 'zo', 'bri', 'cor', 'del', 'fen',
+]
+
+
+def base_volumes(data_folder=None):
+    """Rows per table in the real data: the CSV when present, else what is loaded in the database."""
+    volumes = {}
+    for table, (file_name, model) in SOURCES.items():
+        path = os.path.join(data_folder or DATA_FOLDER, file_name)
+        if os.path.exists(path):
+            volumes[table] = len(pd.read_csv(path, usecols=[0]))
+        else:
+            volumes[table] = model.objects.count()
+    return volumes
+
+
+def _names(rng, count, syllables):
+    # Random syllable words; collisions are fine, the importer drops exact duplicates
+    parts = rng.choice(SYLLABLES, size=(count, syllables))
+    return pd.Series([''.join(row) for row in parts])
+
+
+def generate(dest, scale, volumes, data_folder=None, seed=0):
+    """Write athletes.csv, events.csv and medals.csv with `scale` times `volumes` rows into `dest`.
+
+    Returns the number of rows written per table.
+    """
+    rng = np.random.default_rng(seed)
+    folder = data_folder or DATA_FOLDER
+    real_events = pd.read_csv(os.path.join(folder, 'events.csv'))
+    real_medals = pd.read_csv(os.path.join(folder, 'medals.csv'))
+    counts = {table: max(1, round(volume * scale)) for table, volume in volumes.items()}
+
+    # Events: the real ones, repeated with a numbered suffix to keep (event, sport) unique
+    picks = real_events.iloc[np.arange(counts['events']) % len(real_events)].reset_index(drop=True)
+    copy = pd.Series(np.arange(counts['events']) // len(real_events))
+    events = pd.DataFrame({
+        'event': picks['event'].where(copy == 0, picks['event'] + ' ' + copy.astype(str)),
+        'sport': picks['sport'],
+        'sport_code': picks['sport_code'],
+    })
+
+    # Athletes: "SURNAME Given", spread over the real countries and sports
+    country_codes = real_medals.dropna(subset=['country', 'country_code']).drop_duplicates('country')
+    country_codes = country_codes.set_index('country')['country_code']
+    countries = country_codes.index.to_numpy()
+    sports = real_events['sport'].dropna().unique()
+    athlete_sports = rng.choice(sports, counts['athletes'])
+    surnames = _names(rng, counts['athletes'], 3).str.upper()
+    given = _names(rng, counts['athletes'], 2).str.capitalize()
+    athlete_countries = rng.choice(countries, counts['athletes'])
+    athletes = pd.DataFrame({
+        'code': 1_000_000 + np.arange(counts['athletes']),
+        'name': surnames + ' ' + given,
+        'country': athlete_countries,
+        'country_code': country_codes[athlete_countries].to_numpy(),
+        'disciplines': [f"['{sport}']" for sport in athlete_sports],
+        'birth_date': pd.Timestamp('1975-01-01') + pd.to_timedelta(rng.integers(0, 365 * 30, counts['athletes']), unit='D'),
+        'birth_place': None,
+        'height': rng.normal(175, 10, counts['athletes']).round(),
+        'weight': rng.normal(70, 12, counts['athletes']).round(),
+        'coach': None,
+    })
+
+    # Medals: real proportions of medal and event types; names written "Given SURNAME" as in medals.csv
+    winners = athletes.iloc[rng.integers(0, len(athletes), counts['medals'])].reset_index(drop=True)
+    won = events.iloc[rng.integers(0, len(events), counts['medals'])].reset_index(drop=True)
+    medal_types = real_medals[['medal_type', 'medal_code']].drop_duplicates('medal_type')
+    medal = medal_types.iloc[rng.integers(0, len(medal_types), counts['medals'])].reset_index(drop=True)
+    event_type = pd.Series(rng.choice(real_medals['event_type'].dropna().to_numpy(), counts['medals']))
+    team = event_type.isin(TEAM_EVENT_TYPES)
+    dates = pd.to_datetime(real_medals['medal_date']).dt.date.unique()
+    medals = pd.DataFrame({
+        'medal_type': medal['medal_type'],
+        'medal_code': medal['medal_code'],
+        'medal_date': rng.choice(dates, counts['medals']),
+        'name': winners['name'].str.split(' ', n=1).str[::-1].str.join(' ').where(~team, winners['country']),
+        # The athlete's code, or one code per country's team
+        'code': winners['code'].astype(str).where(~team, 'TEAM-' + winners['country']),
+        'discipline': won['sport'],
+        'event': won['event'],
+        'event_type': event_type,
+        'country': winners['country'],
+        'country_code': winners['country_code'],
+    })
+
+    os.makedirs(dest, exist_ok=True)
+    athletes.to_csv(os.path.join(dest, 'athletes.csv'), index=False)
+    events.to_csv(os.path.join(dest, 'events.csv'), index=False)
+    medals.to_csv(os.path.join(dest, 'medals.csv'), index=False)
+    return {'athletes': len(athletes), 'events': len(events), 'medals': len(medals)}
+
+
+@contextmanager
+def benchmark_database(scale, seed=0):
+    """Generate data at `scale` and switch to an empty throwaway SQLite database for the duration.
+
+    Yields (data folder, generated rows per table, base volumes); the
+    caller imports the CSVs from the data folder.
+    """
+    volumes = base_volumes()
+    with tempfile.TemporaryDirectory(prefix='olympics-bench-') as workdir:
+        data_folder = os.path.join(workdir, 'data')
+        rows = generate(data_folder, scale, volumes, seed=seed)
+
+        # A file (not :memory:) so PDF worker processes and other threads see the same database
+        connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        setup_test_environment()
+        try:
+            # Keep rendered charts and PDFs away from the real cache directories
+            with mock.patch.object(charts, 'CHART_CACHE_DIR', os.path.join(workdir, 'charts')), \
+                    mock.patch.object(jobs, 'EXPORT_ROOT', os.path.join(workdir, 'exports')):
+                cache.clear()
+                yield data_folder, rows, volumes
+        finally:
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            cache.clear()
@@ -1,3 +1,902 @@
-from django.test import TestCase
+import datetime
+import gzip
+import io
+import os
+import tempfile
 
-# Create your tests here.
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from . import analytics, charts, facets, import_data, jobs, pdf, perf, physique, search, standings, timeline
+from .filters import AthleteFilter, EventFilter, MedalFilter
+from .pagination import paginate
+from .models import Athlete, Country, DataVersion, Discipline, Event, ExportJob, Medal, MedalDay, MedalType
+from .routers import ReadReplicaRouter
+from .versions import get_version
+
+
+async def drain(response):
+    # Exports stream from async iterators under ASGI
+    return b''.join([chunk async for chunk in response.streaming_content])
+
+
+def content(response):
+    if response.is_async:
+        return async_to_sync(drain)(response)
+    return b''.join(response.streaming_content)
+
+
+class QueryCountTests(TestCase):
+    """Each page runs a fixed number of queries however many rows it shows.
+
+    A template or view change that starts querying per row (an N+1) makes
+    the count grow with the data and fails here.
+    """
+
+    # URL name, query string -> queries with cold caches (the user lookup included; sessions are cookies)
+    EXPECTED = {
+        ('home', ''): 6,  # The analytics snapshot loads here; warm, home only checks its version
+        ('athletes_list', ''): 6,
+        ('athletes_list', 'q=an&sport=Judo'): 7,
+        ('events_list', ''): 6,
+        ('medals_list', ''): 7,
+        ('medals_list', 'medal_type=Gold+Medal&country=FRA'): 9,
+        ('medal_standings', ''): 5,
+        ('export_athletes_csv', ''): 2,
+        ('export_events_csv', ''): 2,
+        ('export_medals_csv', ''): 2,
+        ('athletes_api', ''): 5,
+        ('events_api', ''): 5,
+        ('medals_api', 'fields=athlete_name,event_name'): 5,
+        ('medals_facets_api', ''): 4,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user('fan', password='secret')
+        self.client.force_login(self.user)
+        self.seeded = 0
+
+    def seed(self, count):
+        # Rows spread over a few sports, countries and medal types
+        start, self.seeded = self.seeded, self.seeded + count
+        sports = ['Judo', 'Rowing', 'Fencing']
+        countries = ['France', 'Japan', 'Kenya']
+        nocs = {
+            name: Country.objects.get_or_create(code=name[:3].upper(), defaults={'name': name})[0]
+            for name in countries
+        }
+        medal_types = ['Gold Medal', 'Silver Medal', 'Bronze Medal']
+        athletes = Athlete.objects.bulk_create(
+            Athlete(name=f"ATHLETE{i} Anna", country=countries[i % 3], noc=nocs[countries[i % 3]], sport=sports[i % 3])
+            for i in range(start, self.seeded)
+        )
+        disciplines = {sport: Discipline.objects.get_or_create(name=sport)[0] for sport in sports}
+        Athlete.disciplines.through.objects.bulk_create(
+            Athlete.disciplines.through(athlete=athlete, discipline=disciplines[athlete.sport]) for athlete in athletes
+        )
+        events = Event.objects.bulk_create(
+            Event(name=f"Event {i}", sport=sports[i % 3], sport_code=sports[i % 3][:3].upper())
+            for i in range(start, self.seeded)
+        )
+        Medal.objects.bulk_create(
+            Medal(
+                medal_type=medal_types[i % 3], medal_code=i % 3 + 1, country=athlete.country, noc=athlete.noc,
+                athlete=athlete, event=event, discipline=event.sport,
+            )
+            for i, (athlete, event) in enumerate(zip(athletes, events))
+        )
+
+    def count_queries(self, name, query):
+        cache.clear()
+        facets.clear()
+        analytics.clear()
+        url = reverse(name) + (f"?{query}" if query else '')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                content(response)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_query_counts_do_not_grow_with_the_data(self):
+        for rows in (3, 60):
+            self.seed(rows)
+            for (name, query), expected in self.EXPECTED.items():
+                with self.subTest(view=name, query=query, rows=self.seeded):
+                    self.assertEqual(self.count_queries(name, query), expected)
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        self.seed(3)
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('auth_user', tables)
+
+    def test_saving_a_user_refreshes_the_cached_lookup(self):
+        self.client.get(reverse('home'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+
+
+class PaginationTests(TestCase):
+    """Cursor pages visit every row once in both directions, however many rows share a sort value."""
+
+    def page(self, **params):
+        request = RequestFactory().get('/athletes/', {'page_size': 3, **params})
+        spec = AthleteFilter.from_params(request.GET)
+        return paginate(request, spec.list_queryset(), spec)
+
+    def test_cursors_round_trip_over_tied_names(self):
+        ids = [Athlete.objects.create(name='Same Name', country='France', sport='Judo').id for _ in range(7)]
+
+        forward, page = [], self.page()
+        while True:
+            forward.append([athlete.id for athlete in page])
+            if not page.has_next:
+                break
+            page = self.page(after=page.next_cursor)
+        self.assertEqual(forward, [ids[0:3], ids[3:6], ids[6:7]])
+        self.assertEqual(page.total_count, 7)
+
+        backward = [[athlete.id for athlete in page]]
+        while page.has_previous:
+            page = self.page(before=page.previous_cursor)
+            backward.append([athlete.id for athlete in page])
+        self.assertEqual(backward[::-1], forward)
+        self.assertFalse(page.has_previous)
+
+    def test_urls_keep_the_filters(self):
+        for _ in range(4):
+            Athlete.objects.create(name='Same Name', country='France', sport='Judo')
+        page = self.page(q='same')
+        self.assertEqual(len(page), 3)
+        self.assertEqual(page.next_url(), f"?q=same&after={page.next_cursor}&page_size=3")
+
+
+@override_settings(ATHLETE_SEARCH_BACKEND='fts5')
+class SearchTests(TestCase):
+    """The FTS5 athlete index matches word prefixes and follows every write to the athlete table."""
+
+    def search(self, query):
+        return sorted(search.search_athletes(Athlete.objects.all(), query).values_list('name', flat=True))
+
+    def test_index_follows_updates_and_deletes(self):
+        Athlete.objects.create(name='Teddy RINER', country='France', sport='Judo')
+        zoe = Athlete.objects.create(name='Zoé ROBERT', country='Belgium', sport='Judo')
+        search.create_index()
+
+        self.assertEqual(self.search('rin fra'), ['Teddy RINER'])
+        self.assertEqual(self.search('zoe'), ['Zoé ROBERT'])
+        self.assertEqual(self.search('judo'), [])  # Only name and country are searched
+
+        zoe.name = 'Zoé DUPONT'
+        zoe.save()
+        self.assertEqual(self.search('robert'), [])
+        self.assertEqual(self.search('dupont'), ['Zoé DUPONT'])
+
+        Athlete.objects.bulk_create([Athlete(name='Shohei ONO', country='Japan', sport='Judo')])
+        self.assertEqual(self.search('ono'), ['Shohei ONO'])
+
+        Athlete.objects.filter(name='Teddy RINER').delete()
+        self.assertEqual(self.search('riner'), [])
+        self.assertEqual(self.search('"quoted'), [])
+
+
+class ApiTests(TestCase):
+    """The JSON API returns the requested fields and answers revalidations from the data version."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('fan'))
+        Event.objects.create(name='Marathon', sport='Athletics', sport_code='ATH')
+        self.url = reverse('events_api')
+
+    def test_fields_select_columns(self):
+        results = self.client.get(self.url, {'fields': 'name, sport_code'}).json()['results']
+        self.assertEqual(results, [{'id': results[0]['id'], 'name': 'Marathon', 'sport_code': 'ATH'}])
+
+        response = self.client.get(self.url, {'fields': 'name,venue'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('venue', response.json()['error'])
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_matching_etag_is_not_modified_until_the_data_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # Another filter set is another representation
+        self.assertEqual(self.client.get(self.url, {'q': 'mara'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        Event.objects.create(name='Final', sport='Judo', sport_code='JUD')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['count'], 2)
+
+
+class FacetTests(TestCase):
+    """Each facet counts its values under every other active filter, and writes drop the cached counts."""
+
+    def setUp(self):
+        cache.clear()
+        facets.clear()
+        france = Country.objects.create(code='FRA', name='France')
+        japan = Country.objects.create(code='JPN', name='Japan')
+        for noc, medal_type, count in [
+            (france, 'Gold Medal', 2), (france, 'Bronze Medal', 1),
+            (japan, 'Gold Medal', 1), (japan, 'Silver Medal', 3),
+        ]:
+            for _ in range(count):
+                Medal.objects.create(medal_type=medal_type, noc=noc, country=noc.name)
+
+    def counts(self, spec):
+        return {
+            field: {item['value']: item['count'] for item in items} for field, items in facets.get_facets(spec).items()
+        }
+
+    def test_counts_follow_the_other_filters(self):
+        self.assertEqual(self.counts(MedalFilter()), {
+            'medal_type': {'Bronze Medal': 1, 'Gold Medal': 3, 'Silver Medal': 3},
+            'country': {'FRA': 3, 'JPN': 4},
+        })
+        # A facet ignores its own filter, so the other values stay selectable; values left with no rows count 0
+        self.assertEqual(self.counts(MedalFilter(medal_type='Gold Medal')), {
+            'medal_type': {'Bronze Medal': 1, 'Gold Medal': 3, 'Silver Medal': 3},
+            'country': {'FRA': 2, 'JPN': 1},
+        })
+        self.assertEqual(self.counts(MedalFilter(medal_type='Silver Medal', country='JPN')), {
+            'medal_type': {'Bronze Medal': 0, 'Gold Medal': 1, 'Silver Medal': 3},
+            'country': {'FRA': 0, 'JPN': 3},
+        })
+        # Country labels are the names
+        self.assertEqual(
+            [item['label'] for item in facets.get_facets(MedalFilter())['country']], ['France', 'Japan'],
+        )
+
+    def test_writes_drop_the_lru_entries_of_their_facets(self):
+        facets.get_facets(MedalFilter())
+        facets.get_facets(EventFilter())
+        prefix = f"facet:{Medal._meta.label_lower}:"
+        self.assertTrue(any(key.startswith(prefix) for key in facets._lru))
+
+        Medal.objects.create(medal_type='Bronze Medal', noc=Country.objects.get(code='JPN'), country='Japan')
+        self.assertFalse(any(key.startswith(prefix) for key in facets._lru))
+        # Facets over other tables keep their entries
+        self.assertTrue(any(key.startswith(f"facet:{Event._meta.label_lower}:") for key in facets._lru))
+        self.assertEqual(self.counts(MedalFilter())['country'], {'FRA': 3, 'JPN': 5})
+
+
+class PerfTests(TestCase):
+    """Request recording, N+1 detection and the percentiles /_perf/ reports."""
+
+    def test_percentile_is_nearest_rank(self):
+        self.assertIsNone(perf.percentile([], 50))
+        self.assertEqual(perf.percentile([1, 2], 50), 1)
+        self.assertEqual(perf.percentile(list(range(1, 7)), 50), 3)
+        self.assertEqual(perf.percentile(list(range(1, 21)), 95), 19)
+        self.assertEqual(perf.percentile(list(range(1, 101)), 7), 7)
+        self.assertEqual(perf.percentile([5, 6, 7], 0), 5)
+        self.assertEqual(perf.percentile([5, 6, 7], 100), 7)
+
+    def test_middleware_records_requests_and_flags_repeated_queries(self):
+        events = [Event.objects.create(name=f"Event {i}", sport='Judo', sport_code='JUD') for i in range(8)]
+
+        def n_plus_one(request):
+            for event in events:
+                Event.objects.filter(id=event.id).first()
+            return HttpResponse('ok')
+
+        with self.assertLogs('olympics.perf', 'WARNING'):
+            perf.PerfMiddleware(n_plus_one)(RequestFactory().get('/n-plus-one/'))
+        record = [row for row in perf.records() if row['path'] == '/n-plus-one/'][-1]
+        self.assertEqual((record['status'], record['sql_count'], record['bytes']), (200, 8, 2))
+        self.assertEqual(record['n_plus_one'], [{'sql': record['n_plus_one'][0]['sql'], 'count': 8}])
+        self.assertIn('WHERE "olympics_event"."id" = ?', record['n_plus_one'][0]['sql'])
+
+        # A page under the threshold is recorded without a warning, under its view name
+        self.client.force_login(User.objects.create_user('fan'))
+        self.client.get(reverse('events_list'))
+        record = perf.records()[-1]
+        self.assertEqual(record['view'], 'events_list')
+        self.assertGreater(record['sql_count'], 0)
+        self.assertEqual(record['n_plus_one'], [])
+
+        summary = {row['view']: row for row in perf.summarize(perf.records())}
+        self.assertEqual(summary['/n-plus-one/']['n_plus_one_requests'], 1)
+
+    async def test_asgi_requests_count_the_queries_of_their_orm_threads(self):
+        await Event.objects.acreate(name='Marathon', sport='Athletics', sport_code='ATH')
+        user = await User.objects.acreate(username='fan')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('events_list'))
+        self.assertEqual(response.status_code, 200)
+        record = perf.records()[-1]
+        self.assertEqual(record['view'], 'events_list')
+        self.assertGreater(record['sql_count'], 0)
+        self.assertGreater(record['sql_ms'], 0)
+
+
+class RouterTests(SimpleTestCase):
+    """Dashboard reads go to the replica, except inside a transaction; everything else stays on the primary."""
+
+    # Not a TestCase: its per-test transaction would keep every read on the primary
+    databases = {'default'}
+    dashboard = [Athlete, Athlete.disciplines.through, Country, DataVersion, Discipline, Event, Medal, MedalDay]
+
+    def test_reads_and_writes(self):
+        router = ReadReplicaRouter()
+        for model in self.dashboard:
+            self.assertEqual(router.db_for_read(model), 'replica', model)
+            self.assertEqual(router.db_for_write(model), 'default', model)
+        for model in (User, ExportJob):
+            self.assertEqual(router.db_for_read(model), 'default', model)
+
+        with transaction.atomic():
+            for model in self.dashboard:
+                self.assertEqual(router.db_for_read(model), 'default', model)
+        self.assertEqual(router.db_for_read(Athlete), 'replica')
+
+        self.assertTrue(router.allow_migrate('default', 'olympics'))
+        self.assertFalse(router.allow_migrate('replica', 'olympics'))
+
+
+class ExportTests(TestCase):
+    """CSV exports stream from the cursor under both handlers instead of being buffered."""
+
+    def setUp(self):
+        user = User.objects.create_user('fan')
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        Event.objects.bulk_create(Event(name=f"Event {i}", sport='Judo', sport_code='JUD') for i in range(3))
+        self.expected = b'Event Name,Sport,Sport Code\r\n' + b''.join(
+            f"Event {i},Judo,JUD\r\n".encode() for i in range(3)
+        )
+
+    def test_wsgi_streams_a_sync_iterator(self):
+        # Django buffers an async iterator in full when a WSGI server reads it
+        response = self.client.get(reverse('export_events_csv'))
+        self.assertFalse(response.is_async)
+        self.assertEqual(content(response), self.expected)
+
+    def test_asgi_streams_an_async_iterator(self):
+        response = async_to_sync(self.async_client.get)(reverse('export_events_csv'))
+        self.assertTrue(response.is_async)
+        self.assertEqual(content(response), self.expected)
+
+    def test_gzip_stream_decodes_to_the_csv(self):
+        # Large enough to span several compressed chunks
+        Event.objects.bulk_create(
+            Event(name=f"Event {i}", sport='Judo', sport_code='JUD') for i in range(3, 5000)
+        )
+        expected = b'Event Name,Sport,Sport Code\r\n' + b''.join(f"Event {i},Judo,JUD\r\n".encode() for i in range(5000))
+        chunks = list(self.client.get(reverse('export_events_csv'), {'compress': 'gzip'}).streaming_content)
+        self.assertGreater(len([chunk for chunk in chunks if chunk]), 1)
+        for response in (
+            self.client.get(reverse('export_events_csv'), {'compress': 'gzip'}),
+            async_to_sync(self.async_client.get)(reverse('export_events_csv'), {'compress': 'gzip'}),
+        ):
+            self.assertEqual(response['Content-Type'], 'application/gzip')
+            self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+            self.assertEqual(gzip.decompress(content(response)), expected)
+
+
+class PdfTests(SimpleTestCase):
+    """Table PDFs wrap long values inside their cells instead of drawing past them."""
+
+    headings = ['Name', 'Country', 'Sport']
+
+    def setUp(self):
+        self.rows = [(f"Athlete {i}", 'France', 'Judo') for i in range(300)]
+        self.rows[150] = ('Maria ' * 30 + 'Oliveira', 'United Kingdom of Great Britain and Northern Ireland', 'Judo')
+        self.rows[299] = ('X' * 200, 'France', 'Judo')
+
+    def test_every_line_fits_its_column(self):
+        widths = pdf._column_widths(self.headings, self.rows)
+        self.assertAlmostEqual(sum(widths), pdf.PAGE_WIDTH)
+        for row in self.rows:
+            cells, height = pdf._layout_row(row, widths)
+            for text, width in zip(cells, widths):
+                lines = text.split('\n')
+                self.assertEqual(''.join(lines).replace(' ', ''), text.replace('\n', '').replace(' ', ''))
+                for line in lines:
+                    self.assertLessEqual(stringWidth(line, pdf.FONT, pdf.FONT_SIZE), width - 2 * pdf.CELL_PADDING)
+            self.assertEqual(height, max(len(text.split('\n')) for text in cells) * pdf.LEADING + 2 * pdf.CELL_PADDING)
+        # The long rows were measured too, past the first rows, and got wrapped rather than a column of their own
+        self.assertGreater(pdf._layout_row(self.rows[150], widths)[1], pdf._layout_row(self.rows[0], widths)[1])
+        self.assertGreater(pdf._layout_row(self.rows[299], widths)[1], pdf._layout_row(self.rows[0], widths)[1])
+
+    def test_render_keeps_every_row(self):
+        dest = io.BytesIO()
+        pdf.render_table_pdf('Athletes', self.headings, self.rows, dest, processes=1)
+        reader = PdfReader(dest)
+        text = ''.join(page.extract_text() for page in reader.pages)
+        self.assertGreater(len(reader.pages), 1)
+        self.assertIn('Athlete 298', text)
+        # The heading row repeats on every page
+        self.assertEqual(text.count('Name'), len(reader.pages))
+
+
+class ExportJobTests(TestCase):
+    """PDF export jobs run once per report, filters and data version, and record how they ended."""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        for name, value in [('EXPORT_ROOT', folder.name), ('PDF_EXPORT_WORKERS', 0)]:
+            patcher = mock.patch.object(jobs, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Event.objects.create(name='Marathon', sport='Athletics', sport_code='ATH')
+        self.seen = []
+
+    def render(self, ok=True):
+        def render_pdf(title, headings, data, dest):
+            # The job is marked running before the report is built
+            self.seen.append(ExportJob.objects.latest('created_at').status)
+            dest.write(b'%PDF-')
+            return ok
+        return mock.patch.object(jobs, 'render_pdf', render_pdf)
+
+    def test_identical_exports_share_one_job(self):
+        with self.render():
+            job = jobs.submit_export('events', EventFilter())
+            self.assertEqual((job.status, self.seen), (ExportJob.DONE, [ExportJob.RUNNING]))
+            self.assertEqual(jobs.submit_export('events', EventFilter()).id, job.id)
+            self.assertEqual(len(self.seen), 1)
+
+            # Other filters, or the same ones over changed data, are another PDF
+            self.assertNotEqual(jobs.submit_export('events', EventFilter(q='mara')).id, job.id)
+            Event.objects.create(name='Final', sport='Judo', sport_code='JUD')
+            self.assertNotEqual(jobs.submit_export('events', EventFilter()).fingerprint, job.fingerprint)
+
+    def test_failed_jobs_record_the_error_and_are_retried(self):
+        with self.render(ok=False):
+            failed = jobs.submit_export('events', EventFilter())
+        self.assertEqual(failed.status, ExportJob.FAILED)
+        self.assertTrue(failed.error)
+        self.assertIsNotNone(failed.finished_at)
+        self.assertEqual(os.listdir(jobs.EXPORT_ROOT), [])  # The partial file is removed
+
+        with self.render():
+            self.assertEqual(jobs.submit_export('events', EventFilter()).status, ExportJob.DONE)
+
+    def test_running_jobs_are_reused_until_stale(self):
+        key = jobs.fingerprint('events', EventFilter())
+        running = ExportJob.objects.create(report='events', fingerprint=key, status=ExportJob.RUNNING)
+        self.assertEqual(jobs.submit_export('events', EventFilter()).id, running.id)
+
+        ExportJob.objects.filter(id=running.id).update(created_at=timezone.now() - jobs.STALE_JOB_AFTER * 2)
+        with self.render():
+            job = jobs.submit_export('events', EventFilter())
+        self.assertNotEqual(job.id, running.id)
+        self.assertEqual(job.status, ExportJob.DONE)
+
+    def test_old_jobs_and_unreferenced_files_are_pruned(self):
+        with self.render():
+            old = jobs.submit_export('events', EventFilter(q='mara'))
+            kept = jobs.submit_export('events', EventFilter())
+        orphan = os.path.join(jobs.EXPORT_ROOT, 'events-orphan.pdf')
+        fresh = os.path.join(jobs.EXPORT_ROOT, 'events-fresh.pdf')
+        for path in (orphan, fresh):
+            with open(path, 'wb') as fh:
+                fh.write(b'%PDF-')
+        long_ago = (timezone.now() - jobs.EXPORT_RETENTION * 2).timestamp()
+        for path in (jobs.job_path(old), jobs.job_path(kept), orphan):
+            os.utime(path, (long_ago, long_ago))
+        ExportJob.objects.filter(id=old.id).update(created_at=timezone.now() - jobs.EXPORT_RETENTION * 2)
+
+        # A new job sweeps the folder first
+        with self.render():
+            new = jobs.submit_export('events', EventFilter(q='judo'))
+        self.assertFalse(ExportJob.objects.filter(id=old.id).exists())
+        # A file still recorded by a job, or too recent to be unrecorded for good, is kept
+        self.assertEqual(
+            sorted(os.listdir(jobs.EXPORT_ROOT)),
+            sorted([kept.file, new.file, 'events-fresh.pdf']),
+        )
+
+    def test_download_of_a_removed_file(self):
+        self.client.force_login(User.objects.create_user('fan'))
+        with self.render():
+            job = jobs.submit_export('events', EventFilter())
+        url = reverse('export_job_download', args=[job.id])
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-')
+        response.close()
+
+        os.remove(jobs.job_path(job))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # A job whose file is gone is rendered again rather than reused
+        with self.render():
+            self.assertNotEqual(jobs.submit_export('events', EventFilter()).id, job.id)
+
+
+class AnalyticsTests(TestCase):
+    """The in-memory snapshot agrees with the ORM and reloads when the data version moves."""
+
+    def test_snapshot_follows_the_data_version(self):
+        france = Country.objects.create(code='FRA', name='France')
+        japan = Country.objects.create(code='JPN', name='Japan')
+        analytics.clear()
+        for name, noc in [('Anna', france), ('Ben', france), ('Chie', japan)]:
+            Athlete.objects.create(name=name, country=noc.name, noc=noc, sport='Judo')
+
+        snapshot = analytics.get_snapshot()
+        self.assertEqual(snapshot.count_by('athletes', 'country'), [('France', 2), ('Japan', 1)])
+        self.assertEqual(snapshot.count_by('athletes', 'country', country='Japan'), [('Japan', 1)])
+        self.assertEqual(snapshot.head('athletes', ['name'], 2), [{'name': 'Anna'}, {'name': 'Ben'}])
+        with self.assertNumQueries(1):
+            self.assertIs(analytics.get_snapshot(), snapshot)
+
+        Athlete.objects.filter(name='Ben').delete()
+        self.assertEqual(analytics.get_snapshot().count_by('athletes', 'country'), [('France', 1), ('Japan', 1)])
+
+    def test_physique_leaves_out_unknown_measurements(self):
+        judo = Discipline.objects.create(name='Judo')
+        analytics.clear()
+        for height, weight in [(180, 75), (170, 0), (0, 0)]:
+            Athlete.objects.create(name='A', country='France', sport='Judo', height=height, weight=weight).disciplines.add(judo)
+        Athlete.objects.create(name='B', country='France', sport='Rowing', height=200, weight=100)
+
+        summary = physique.get_physique('Judo')
+        self.assertEqual((summary['athletes'], summary['height']['count'], summary['weight']['count']), (3, 2, 1))
+        self.assertEqual(summary['height']['percentiles']['p50'], 175)
+        self.assertEqual(summary['bmi']['classes'], {'underweight': 0, 'normal': 1, 'overweight': 0, 'obese': 0})
+        self.assertEqual(physique.get_physique('')['athletes'], 4)
+
+    def test_physique_views_reject_unknown_sports(self):
+        Discipline.objects.create(name='Judo')
+        self.client.force_login(User.objects.create_user('fan'))
+        url = reverse('athletes_physique_json')
+        self.assertEqual(self.client.get(url, {'sport': 'Judo'}).json()['sport'], 'Judo')
+        self.assertEqual(self.client.get(url).json()['sport'], '')
+        self.assertEqual(self.client.get(url, {'sport': 'Quidditch'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('athletes_physique_graph'), {'sport': 'Quidditch'}).status_code, 404)
+
+    def test_country_and_discipline_writes_refresh_their_readers(self):
+        japan = Country.objects.create(code='JPN', name='Japan')
+        judo = Discipline.objects.create(name='Judo')
+        analytics.clear()
+        Athlete.objects.create(name='Chie', country='Japan', noc=japan, sport='Judo').disciplines.add(judo)
+        Medal.objects.create(medal_type='Gold Medal', medal_code=1, medal_date=datetime.date(2024, 7, 27), noc=japan)
+        self.assertEqual(analytics.get_snapshot().count_by('athletes', 'country'), [('Japan', 1)])
+        self.assertEqual(timeline.get_timeline(1)['countries'][0]['country'], 'Japan')
+        self.assertEqual(physique.get_physique('Judo')['athletes'], 1)
+
+        japan.name = 'Nippon'
+        japan.save()
+        judo.name = 'Judo (Open)'
+        judo.save()
+        self.assertEqual(analytics.get_snapshot().count_by('athletes', 'country'), [('Nippon', 1)])
+        self.assertEqual(timeline.get_timeline(1)['countries'][0]['country'], 'Nippon')
+        self.assertEqual(physique.get_physique('Judo')['athletes'], 0)
+        self.assertEqual(physique.get_physique('Judo (Open)')['athletes'], 1)
+
+
+class ChartCacheTests(TestCase):
+    """Charts kept on disk are named after the data drawn, and each write removes the older renders."""
+
+    def test_a_reset_database_never_serves_the_old_render(self):
+        with tempfile.TemporaryDirectory() as folder, mock.patch.object(charts, 'CHART_CACHE_DIR', folder):
+            Event.objects.create(name='Marathon', sport='Athletics', sport_code='ATH')
+            analytics.clear()
+            cache.clear()
+            first = charts.get_chart('events_by_sport', charts.chart_stamp('events_by_sport'))
+            self.assertEqual(len(os.listdir(folder)), 1)
+
+            # Different rows at the same version counters, as after recreating the database
+            versions = list(DataVersion.objects.values_list('table', 'version'))
+            Event.objects.all().delete()
+            Event.objects.create(name='Final', sport='Judo', sport_code='JUD')
+            for table, version in versions:
+                DataVersion.objects.filter(table=table).update(version=version)
+            analytics.clear()
+            cache.clear()
+
+            second = charts.get_chart('events_by_sport', charts.chart_stamp('events_by_sport'))
+            self.assertNotEqual(second, first)
+            self.assertEqual(os.listdir(folder), [os.path.basename(charts.chart_path('events_by_sport', [('Judo', 1)]))])
+
+
+class TimelineTests(TestCase):
+    """The running totals follow medal writes without recomputing earlier days."""
+
+    def days(self):
+        return list(MedalDay.objects.order_by('noc__code', 'day').values_list('noc__code', 'day', 'medals', 'cumulative'))
+
+    def test_running_totals_match_a_rebuild(self):
+        france = Country.objects.create(code='FRA', name='France')
+        japan = Country.objects.create(code='JPN', name='Japan')
+        day1, day2, day3 = (datetime.date(2024, 7, 27) + datetime.timedelta(days=n) for n in range(3))
+        for day, noc in [(day1, france), (day1, japan), (day2, france)]:
+            Medal.objects.create(medal_type='Gold Medal', medal_code=1, medal_date=day, noc=noc)
+
+        # Appending a day writes only that day's row
+        with CaptureQueriesContext(connection) as queries:
+            Medal.objects.create(medal_type='Gold Medal', medal_code=1, medal_date=day3, noc=japan)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "olympics_medalday"')]
+        self.assertEqual(len(inserts), 1)
+
+        # An earlier day shifts the later running totals; moving a medal takes it off its old day
+        medal = Medal.objects.create(medal_type='Silver Medal', medal_code=2, medal_date=day1, noc=japan)
+        medal.medal_date = day2
+        medal.save()
+        Medal.objects.filter(noc=france, medal_date=day1).delete()
+
+        self.assertEqual(self.days(), [
+            ('FRA', day2, 1, 1),
+            ('JPN', day1, 1, 1), ('JPN', day2, 1, 2), ('JPN', day3, 1, 3),
+        ])
+        incremental = self.days()
+        timeline.rebuild()
+        self.assertEqual(self.days(), incremental)
+
+        data = timeline.get_timeline(1)
+        self.assertEqual(data['days'], [day1.isoformat(), day2.isoformat(), day3.isoformat()])
+        self.assertEqual(data['countries'], [{'code': 'JPN', 'country': 'Japan', 'medals': [1, 1, 1], 'cumulative': [1, 2, 3]}])
+
+
+class StandingsTests(TestCase):
+    """Countries rank by golds, then silvers, then bronzes; a full tie shares the rank."""
+
+    def test_tied_countries_share_a_rank(self):
+        tallies = {
+            ('USA', 'United States'): (2, 0, 0),
+            ('GBR', 'Great Britain'): (1, 2, 0),
+            ('CHN', 'China'): (1, 2, 0),
+            ('FRA', 'France'): (1, 1, 5),
+            ('JPN', 'Japan'): (0, 0, 1),
+        }
+        for (code, name), counts in tallies.items():
+            noc = Country.objects.create(code=code, name=name)
+            for medal_code, count in zip((1, 2, 3), counts):
+                for _ in range(count):
+                    Medal.objects.create(medal_code=medal_code, noc=noc, discipline='Judo')
+
+        rows = standings.compute_standings({})
+        self.assertEqual(
+            [(row['rank'], row['code'], row['gold'], row['silver'], row['bronze'], row['total']) for row in rows],
+            [
+                (1, 'USA', 2, 0, 0, 2),
+                (2, 'CHN', 1, 2, 0, 3),
+                (2, 'GBR', 1, 2, 0, 3),
+                (4, 'FRA', 1, 1, 5, 7),
+                (5, 'JPN', 0, 0, 1, 1),
+            ],
+        )
+
+        # Cached until a medal or a country changes
+        self.assertEqual(standings.get_standings({})[-1]['country'], 'Japan')
+        japan = Country.objects.get(code='JPN')
+        japan.name = 'Nippon'
+        japan.save()
+        self.assertEqual(standings.get_standings({})[-1]['country'], 'Nippon')
+
+    def test_relabelled_medals_rank_by_their_new_type(self):
+        noc = Country.objects.create(code='JPN', name='Japan')
+        medal = Medal.objects.create(medal_type='Gold Medal', noc=noc)
+        self.assertEqual(medal.medal_code, MedalType.GOLD)
+
+        medal.medal_type = 'Bronze Medal'
+        medal.save()
+        self.assertEqual(Medal.objects.get(id=medal.id).medal_code, MedalType.BRONZE)
+        medal.medal_type = 'Silver Medal'
+        medal.save(update_fields=['medal_type'])
+        self.assertEqual(Medal.objects.get(id=medal.id).medal_code, MedalType.SILVER)
+        row = standings.compute_standings({})[0]
+        self.assertEqual((row['gold'], row['silver'], row['bronze']), (0, 1, 0))
+
+        # A medal given only a code gets the matching label
+        self.assertEqual(Medal.objects.create(medal_code=MedalType.GOLD, noc=noc).medal_type, 'Gold Medal')
+
+
+class MedalTypeTests(SimpleTestCase):
+    def test_from_label(self):
+        self.assertEqual(MedalType.from_label('Gold Medal'), MedalType.GOLD)
+        self.assertEqual(MedalType.from_label(' silver '), MedalType.SILVER)
+        for label in ('', '   ', None, float('nan'), 'Platinum'):
+            self.assertIsNone(MedalType.from_label(label))
+
+
+class ImportTests(TestCase):
+    """A bulk import of the three CSV files links every medal and can be run again safely."""
+
+    EVENTS = [
+        'event,sport,sport_code',
+        "Men's Individual,Archery,ARC",
+        "Men's Individual,Judo,JUD",
+        'Mixed Team,Judo,JUD',
+    ]
+    ATHLETES = [
+        'code,name,country_code,country,country_full,disciplines,birth_date,height,weight',
+        '1001,KIM Woojin,KOR,Korea,Republic of Korea,[\'Archery\'],1992-06-20,180,80',
+        '1002,KIM Woojin,PRK,DPR Korea,Democratic People\'s Republic of Korea,[\'Archery\'],1999-01-01,175,70',
+        '1003,RINER Teddy,FRA,France,France,[\'Judo\'],1989-04-07,204,140',
+    ]
+    MEDALS = [
+        'medal_type,medal_code,medal_date,name,discipline,event,event_type,code,country_code,country,country_long',
+        "Gold Medal,1,2024-08-04,Woojin KIM,Archery,Men's Individual,ATH,1001,KOR,Korea,Republic of Korea",
+        "Silver Medal,2,2024-08-02,Teddy RINER,Judo,Men's Individual,ATH,,FRA,France,France",
+        'Gold Medal,1,2024-08-03,France,Judo,Mixed Team,TEAM,JUDOXTEAM---FRA01,FRA,France,France',
+    ]
+
+    def import_all(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for file_name, lines in [('events.csv', self.EVENTS), ('athletes.csv', self.ATHLETES), ('medals.csv', self.MEDALS)]:
+                with open(os.path.join(folder, file_name), 'w') as fh:
+                    fh.write('\n'.join(lines) + '\n')
+            return [
+                import_data.import_events(data_folder=folder).created,
+                import_data.import_athletes(data_folder=folder).created,
+                import_data.import_medals(data_folder=folder).created,
+            ]
+
+    def counts(self):
+        return [model.objects.count() for model in (Event, Athlete, Medal, Country, Discipline, MedalDay)]
+
+    def test_reimport_adds_nothing(self):
+        self.assertEqual(self.import_all(), [3, 3, 3])
+        counts = self.counts()
+        self.assertEqual(counts, [3, 3, 3, 3, 2, 3])
+        versions = list(DataVersion.objects.order_by('table').values_list('table', 'version'))
+
+        self.assertEqual(self.import_all(), [0, 0, 0])
+        self.assertEqual(self.counts(), counts)
+        self.assertEqual(list(DataVersion.objects.order_by('table').values_list('table', 'version')), versions)
+
+    def test_import_and_sync_agree_on_which_medals_are_the_same(self):
+        # A team code with two medals in one event is one medal to a sync, so the import keeps one too
+        self.MEDALS = [self.MEDALS[0], self.MEDALS[1], self.MEDALS[3], self.MEDALS[3].replace('Gold Medal,1', 'Bronze Medal,3')]
+        self.assertEqual(self.import_all(), [3, 3, 2])
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, 'medals.csv'), 'w') as fh:
+                fh.write('\n'.join(self.MEDALS) + '\n')
+            result = import_data.sync_medals(data_folder=folder)
+        self.assertEqual((result.created, result.updated, result.deleted, result.unchanged), (0, 0, 0, 2))
+
+    def test_medals_link_to_their_athlete_event_and_country(self):
+        self.import_all()
+        links = {
+            medal.medal_type + ' ' + medal.event.name: (
+                medal.athlete and (medal.athlete.code, medal.athlete.country), medal.event.sport, medal.noc.code, medal.code,
+            )
+            for medal in Medal.objects.select_related('athlete', 'event', 'noc')
+        }
+        self.assertEqual(links, {
+            # By athlete code, although another athlete has the same name
+            "Gold Medal Men's Individual": (('1001', 'Korea'), 'Archery', 'KOR', '1001'),
+            # By name, in either word order, and the event of the medal's own sport
+            "Silver Medal Men's Individual": (('1003', 'France'), 'Judo', 'FRA', None),
+            # Team medals keep the team code and have no athlete
+            'Gold Medal Mixed Team': (None, 'Judo', 'FRA', 'JUDOXTEAM---FRA01'),
+        })
+
+
+class SyncTests(TestCase):
+    """A sync writes only the rows whose CSV values changed."""
+
+    def write_events(self, folder, rows):
+        with open(os.path.join(folder, 'events.csv'), 'w') as fh:
+            fh.write('event,sport,sport_code\n' + ''.join(f"{name},{sport},{code}\n" for name, sport, code in rows))
+
+    def test_sync_applies_only_the_diff(self):
+        rows = [("Men's Singles", 'Tennis', 'TEN'), ("Women's Singles", 'Tennis', 'TEN'), ('Marathon', 'Athletics', 'ATH')]
+        with tempfile.TemporaryDirectory() as folder:
+            self.write_events(folder, rows)
+            self.assertEqual(import_data.sync_events(data_folder=folder).created, 3)
+            version = get_version(Event)
+
+            result = import_data.sync_events(data_folder=folder)
+            self.assertEqual((result.created, result.updated, result.deleted, result.unchanged), (0, 0, 0, 3))
+            self.assertEqual(get_version(Event), version)
+
+            self.write_events(folder, [rows[0], ("Women's Singles", 'Tennis', 'TNS')])
+            result = import_data.sync_events(data_folder=folder)
+            self.assertEqual((result.created, result.updated, result.deleted, result.unchanged), (0, 1, 1, 1))
+            self.assertEqual(Event.objects.get(name="Women's Singles").sport_code, 'TNS')
+            self.assertEqual(Event.objects.count(), 2)
+            self.assertGreater(get_version(Event), version)
+
+    def test_stored_rows_sharing_a_key_are_reduced_to_one(self):
+        kept = Event.objects.create(name='Marathon', sport='Athletics', sport_code='ATH')
+        Event.objects.create(name='Marathon', sport='Athletics', sport_code='MAR')
+        with tempfile.TemporaryDirectory() as folder:
+            self.write_events(folder, [('Marathon', 'Athletics', 'ATH')])
+            result = import_data.sync_events(data_folder=folder)
+            self.assertEqual((result.created, result.updated, result.deleted), (0, 1, 1))
+            self.assertEqual(list(Event.objects.values_list('id', 'sport_code')), [(kept.id, 'ATH')])
+
+            result = import_data.sync_events(data_folder=folder)
+            self.assertEqual((result.created, result.updated, result.deleted, result.unchanged), (0, 0, 0, 1))
+
+
+class MigrationTests(TransactionTestCase):
+    """Data migrations, run forward and back over a few rows."""
+
+    def migrate(self, target):
+        # Returns the historical models at `target`
+        executor = MigrationExecutor(connection)
+        executor.migrate([('olympics', target)])
+        return executor.loader.project_state([('olympics', target)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_0009_split_athlete_sports(self):
+        apps = self.migrate('0008_discipline')
+        Athlete = apps.get_model('olympics', 'Athlete')
+        swimmer = Athlete.objects.create(name='Swimmer', country='France', sport="['Marathon Swimming', 'Swimming']")
+        judoka = Athlete.objects.create(name='Judoka', country='Japan', sport='Judo')
+        nobody = Athlete.objects.create(name='Nobody', country='Japan', sport='[]')
+
+        apps = self.migrate('0009_split_athlete_sports')
+        Athlete = apps.get_model('olympics', 'Athlete')
+        self.assertEqual(
+            sorted(apps.get_model('olympics', 'Discipline').objects.values_list('name', flat=True)),
+            ['Judo', 'Marathon Swimming', 'Swimming'],
+        )
+        rows = {
+            athlete.id: (athlete.sport, sorted(athlete.disciplines.values_list('name', flat=True)))
+            for athlete in Athlete.objects.all()
+        }
+        self.assertEqual(rows, {
+            swimmer.id: ('Marathon Swimming, Swimming', ['Marathon Swimming', 'Swimming']),
+            judoka.id: ('Judo', ['Judo']),
+            nobody.id: ('', []),
+        })
+
+        Athlete = self.migrate('0008_discipline').get_model('olympics', 'Athlete')
+        self.assertEqual(dict(Athlete.objects.values_list('id', 'sport')), {
+            swimmer.id: "['Marathon Swimming', 'Swimming']",
+            judoka.id: "['Judo']",
+            nobody.id: '[]',
+        })
+
+    def test_0011_backfill_countries(self):
+        apps = self.migrate('0010_country')
+        Athlete, Medal = apps.get_model('olympics', 'Athlete'), apps.get_model('olympics', 'Medal')
+        for name, country in [('Anna', 'France'), ('Ben', 'France'), ('Chie', 'Japan')]:
+            Athlete.objects.create(name=name, country=country, sport='Judo')
+        Medal.objects.create(country='Japan', medal_type='Gold Medal')
+        Medal.objects.create(country='Japan', medal_type='Silver Medal')
+
+        apps = self.migrate('0011_backfill_countries')
+        Athlete, Medal, Country = (apps.get_model('olympics', name) for name in ('Athlete', 'Medal', 'Country'))
+        # Codes and long names come from data/medals.csv
+        self.assertEqual(
+            sorted(Country.objects.values_list('code', 'name', 'long_name')),
+            [('FRA', 'France', 'France'), ('JPN', 'Japan', 'Japan')],
+        )
+        ids = dict(Country.objects.values_list('name', 'id'))
+        self.assertFalse(Athlete.objects.filter(noc__isnull=True).exists())
+        self.assertFalse(Medal.objects.filter(noc__isnull=True).exists())
+        self.assertEqual(dict(Athlete.objects.values_list('name', 'noc_id')), {
+            'Anna': ids['France'], 'Ben': ids['France'], 'Chie': ids['Japan'],
+        })
+
+        # Migrating back keeps the countries; a name without a known code stays unlinked until a sync reads its code
+        apps = self.migrate('0010_country')
+        dora = apps.get_model('olympics', 'Athlete').objects.create(name='Dora', country='Atlantis', sport='Judo')
+        apps = self.migrate('0011_backfill_countries')
+        self.assertIsNone(apps.get_model('olympics', 'Athlete').objects.get(id=dora.id).noc_id)
+        self.assertFalse(apps.get_model('olympics', 'Country').objects.filter(name='Atlantis').exists())
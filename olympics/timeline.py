@@ -0,0 +1,139 @@
+from collections import Counter
+
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Country, Medal, MedalDay
+from .versions import get_stamp
+
+TIMELINE_TOP = 10
+TIMELINE_MAX_TOP = 30
+
+# Tables the timeline is read from: the running totals follow the medals, labels come from the countries
+TIMELINE_MODELS = (Medal, Country)
+
+# Fields whose old values a row change needs, which post_save can no longer see
+TRACKED_FIELDS = {
+    Medal: ['medal_date', 'noc_id'],
+}
+
+
+def tracked_values(instance):
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS.get(type(instance), [])}
+
+
+def contributions(model, values):
+    """The (day, country id) a medal row adds 1 to; medals without a date or country are left out."""
+    if model is not Medal or not values.get('medal_date') or not values.get('noc_id'):
+        return []
+    return [(values['medal_date'], values['noc_id'])]
+
+
+def apply(deltas):
+    """Add each (day, country id) delta to that day's count and to the running totals from that day on.
+
+    A medal on a country's latest day only touches that day's row, so
+    appending a new competition day never rewrites the days before it.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic():
+        for (day, noc_id), delta in sorted(deltas.items()):
+            updated = MedalDay.objects.filter(noc_id=noc_id, day=day).update(
+                medals=F('medals') + delta, cumulative=F('cumulative') + delta
+            )
+            if not updated:
+                before = (
+                    MedalDay.objects.filter(noc_id=noc_id, day__lt=day).order_by('-day')
+                    .values_list('cumulative', flat=True).first()
+                )
+                MedalDay.objects.create(noc_id=noc_id, day=day, medals=delta, cumulative=(before or 0) + delta)
+            MedalDay.objects.filter(noc_id=noc_id, day__gt=day).update(cumulative=F('cumulative') + delta)
+            if delta < 0:
+                MedalDay.objects.filter(noc_id=noc_id, day=day, medals__lte=0).delete()
+
+
+def row_changed(model, old_values, new_values):
+    # Pass None for old_values on insert and for new_values on delete
+    deltas = Counter()
+    if old_values is not None:
+        deltas.subtract(contributions(model, old_values))
+    if new_values is not None:
+        deltas.update(contributions(model, new_values))
+    apply(deltas)
+
+
+def rebuild():
+    """Recompute every day's count and running total from the medals table."""
+    rows = (
+        Medal.objects.filter(medal_date__isnull=False, noc__isnull=False)
+        .values('noc_id', 'medal_date').annotate(count=Count('id')).order_by('noc_id', 'medal_date')
+    )
+    running = Counter()
+    days = []
+    for row in rows:
+        running[row['noc_id']] += row['count']
+        days.append(MedalDay(
+            noc_id=row['noc_id'], day=row['medal_date'], medals=row['count'], cumulative=running[row['noc_id']],
+        ))
+    with transaction.atomic():
+        MedalDay.objects.all().delete()
+        MedalDay.objects.bulk_create(days)
+
+
+def timeline_top(query_dict):
+    # Malformed or out-of-range values fall back to the default, so they can't fragment the cache
+    try:
+        top = int(query_dict.get('top') or TIMELINE_TOP)
+    except ValueError:
+        top = TIMELINE_TOP
+    return top if 1 <= top <= TIMELINE_MAX_TOP else TIMELINE_TOP
+
+
+def compute_timeline(top):
+    """Medals won per day and in total so far, for the `top` countries by final total.
+
+    Reads the stored running totals; a country with no medals on a day
+    carries its total over from the day before.
+    """
+    frame = pd.DataFrame.from_records(
+        list(MedalDay.objects.values_list('day', 'noc__code', 'noc__name', 'medals', 'cumulative')),
+        columns=['day', 'code', 'country', 'medals', 'cumulative'],
+    )
+    if frame.empty:
+        return {'top': top, 'days': [], 'countries': []}
+
+    days = sorted(frame['day'].unique())
+    daily = frame.pivot(index='day', columns='code', values='medals').reindex(days).fillna(0).astype(int)
+    cumulative = frame.pivot(index='day', columns='code', values='cumulative').reindex(days).ffill().fillna(0).astype(int)
+    names = frame.drop_duplicates('code').set_index('code')['country']
+
+    # Largest final total first, ties by country name
+    finals = pd.DataFrame({'total': cumulative.iloc[-1], 'country': names})
+    leaders = finals.sort_values(['total', 'country'], ascending=[False, True]).head(top).index
+    return {
+        'top': top,
+        'days': [day.isoformat() for day in days],
+        'countries': [
+            {
+                'code': code,
+                'country': names[code],
+                'medals': daily[code].tolist(),
+                'cumulative': cumulative[code].tolist(),
+            }
+            for code in leaders
+        ],
+    }
+
+
+def timeline_key(top, stamp):
+    return f"timeline:{stamp.key}:{top}"
+
+
+def get_timeline(top, stamp=None):
+    # Cached per top-N until a medal or country row changes
+    stamp = stamp or get_stamp(*TIMELINE_MODELS)
+    return cache.get_or_set(timeline_key(top, stamp), lambda: compute_timeline(top))
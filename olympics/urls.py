@@ -1,16 +1,23 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, perf, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('athletes/', views.athletes_list, name='athletes_list'),
     path('athletes/visualize/graph/', views.athletes_by_country_graph, name='athletes_by_country_graph'),
     path('athletes/visualization/', views.athletes_visualization, name='athletes_visualization'),
+    path('athletes/physique/graph/', views.athletes_physique_graph, name='athletes_physique_graph'),
+    path('athletes/physique/json/', views.athletes_physique_json, name='athletes_physique_json'),
     path('events/', views.events_list, name='events_list'),
     path('events/visualization/', views.events_visualization, name='events_visualization'),
     path('medals/', views.medals_list, name='medals_list'),
     path('medals/visualization/', views.medals_visualization, name='medals_visualization'),
+    path('medals/standings/', views.medal_standings, name='medal_standings'),
+    path('medals/standings/json/', views.medal_standings_json, name='medal_standings_json'),
+    path('medals/timeline/', views.medal_timeline, name='medal_timeline'),
+    path('medals/timeline/json/', views.medal_timeline_json, name='medal_timeline_json'),
+    path('medals/timeline/graph/', views.medal_timeline_graph, name='medal_timeline_graph'),
     path('register/', views.register, name='register'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
@@ -23,5 +30,14 @@ urlpatterns = [
     path('export/athletes/pdf/', views.export_athletes_pdf, name='export_athletes_pdf'),
     path('export/events/pdf/', views.export_events_pdf, name='export_events_pdf'),
     path('export/medals/pdf/', views.export_medals_pdf, name='export_medals_pdf'),
+    path('export/jobs/<uuid:job_id>/', views.export_job_status, name='export_job_status'),
+    path('api/athletes/', api.athletes_api, name='athletes_api'),
+    path('api/events/', api.events_api, name='events_api'),
+    path('api/medals/', api.medals_api, name='medals_api'),
+    path('api/athletes/facets/', api.athletes_facets_api, name='athletes_facets_api'),
+    path('api/events/facets/', api.events_facets_api, name='events_facets_api'),
+    path('api/medals/facets/', api.medals_facets_api, name='medals_facets_api'),
+    path('export/jobs/<uuid:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('_perf/', perf.perf_report, name='perf_report'),
 ]
  
\ No newline at end of file
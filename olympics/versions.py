@@ -0,0 +1,45 @@
+from collections import namedtuple
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+# `key` changes whenever any of the tables changes; `last_modified` is the newest change
+Stamp = namedtuple('Stamp', ['key', 'last_modified'])
+
+
+def get_version(model):
+    row = DataVersion.objects.filter(table=model._meta.label_lower).values_list('version', flat=True).first()
+    return row or 0
+
+
+def _stamp_query(models):
+    labels = [model._meta.label_lower for model in models]
+    return labels, DataVersion.objects.filter(table__in=labels).values_list('table', 'version', 'updated_at')
+
+
+def _stamp(labels, rows):
+    rows = {table: (version, updated_at) for table, version, updated_at in rows}
+    key = '.'.join(str(rows.get(label, (0, None))[0]) for label in labels)
+    last_modified = max((updated_at for _, updated_at in rows.values()), default=None)
+    return Stamp(key, last_modified)
+
+
+def get_stamp(*models):
+    labels, rows = _stamp_query(models)
+    return _stamp(labels, rows)
+
+
+async def aget_stamp(*models):
+    labels, rows = _stamp_query(models)
+    return _stamp(labels, [row async for row in rows])
+
+
+def bump_version(model):
+    label = model._meta.label_lower
+    updated = DataVersion.objects.filter(table=label).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        DataVersion.objects.get_or_create(table=label, defaults={'version': 1})
@@ -1,28 +1,44 @@
-import csv
-from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
+import os
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, redirect
-from django.db.models import Count, Q
-from .models import Athlete, Event, Medal
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from .models import Discipline, ExportJob
 from .forms import CustomUserCreationForm
+from . import analytics
+from .charts import achart_response, aphysique_chart_response, atimeline_chart_response
+from .exports import export_rows, stream_csv
+from .facets import aget_facets
+from .filters import FILTERS, AthleteFilter, EventFilter, MedalFilter
+from .jobs import job_path, submit_export
+from .pagination import apaginate
+from .physique import get_physique
+from .standings import get_disciplines, get_standings, standings_params
+from .timeline import TIMELINE_MAX_TOP, get_timeline, timeline_top
+
+async def arender(request, template_name, context):
+    # Hand the templates the user login_required already loaded, instead of a lazy one that queries again
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template_name, context)
 
 @login_required
-def home(request):
-    top_athletes = Athlete.objects.all()[:5]
-    top_events = Event.objects.all()[:5]
-    top_medalists = Medal.objects.select_related('athlete', 'event').all()[:5]
+async def home(request):
+    # Totals and top rows come from this process's in-memory snapshot; only its version is queried
+    snapshot = await analytics.aget_snapshot()
+    totals = snapshot.totals()
+    top_athletes = snapshot.head('athletes', ['name', 'sport'], 5)
+    top_events = snapshot.head('events', ['name', 'sport'], 5)
 
     context = {
-        'total_athletes': Athlete.objects.count(),
-        'total_events': Event.objects.count(),
-        'total_medals': Medal.objects.count(),
+        'total_athletes': totals.get('athletes', 0),
+        'total_events': totals.get('events', 0),
+        'total_medals': totals.get('medals', 0),
         'top_athletes': top_athletes,
         'top_events': top_events,
-        'top_medalists': top_medalists,
     }
-    return render(request, 'home.html', context)
+    return await arender(request, 'home.html', context)
 
 from .forms import CustomUserCreationForm
 
@@ -37,403 +53,198 @@ def register(request):
     return render(request, 'register.html', {'form': form})
 
 @login_required
-def athletes_list(request):
-    query = request.GET.get('q', '')
-    sport_filter = request.GET.get('sport', '')
-
-    # Base QuerySet for all athletes
-    athletes = Athlete.objects.all()
-
-    # Apply search filter (by name or country)
-    if query:
-        athletes = athletes.filter(Q(name__icontains=query) | Q(country__icontains=query))
-
-    # Apply sport filter
-    if sport_filter:
-        athletes = athletes.filter(sport__icontains=sport_filter)
-
-    # List of distinct sports for filtering options
-    sports = Athlete.objects.values_list('sport', flat=True).distinct()
-
-    # Count athletes per sport
-    athletes_by_sport = (
-        athletes.values('sport')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
+async def athletes_list(request):
+    spec = AthleteFilter.from_params(request.GET)
+    page = await apaginate(request, spec.list_queryset(), spec)
 
     context = {
-        'athletes': athletes,
-        'sports': sports,
-        'query': query,
-        'sport_filter': sport_filter,
-        'athletes_by_sport': athletes_by_sport,
+        'athletes': page,
+        'page': page,
+        # Every sport, with its athlete count under the other filters
+        'sports': (await aget_facets(spec))['sport'],
+        'query': spec.q,
+        'sport_filter': spec.sport,
     }
-    return render(request, 'athletes.html', context)
+    return await arender(request, 'athletes.html', context)
 
 @login_required
-def events_list(request):
-    query = request.GET.get('q', '')  # Get the search query
-    sport_filter = request.GET.get('sport_code', '')  # Get the sport code filter
-
-    # Base query for events
-    events = Event.objects.all()
-
-    # Apply search functionality
-    if query:
-        events = events.filter(
-            Q(name__icontains=query) | Q(sport__icontains=query)
-        )
-
-    # Apply sport code filter
-    if sport_filter:
-        events = events.filter(sport_code__icontains=sport_filter)
-
-    # Populate distinct sport codes for dropdown
-    sport_codes = Event.objects.values_list('sport_code', flat=True).distinct()
-
-    return render(request, 'events.html', {
-        'events': events,
-        'sport_codes': sport_codes,
-        'query': query,
-        'sport_filter': sport_filter,
+async def events_list(request):
+    spec = EventFilter.from_params(request.GET)
+    page = await apaginate(request, spec.list_queryset(), spec)
+
+    return await arender(request, 'events.html', {
+        'events': page,
+        'page': page,
+        'sport_codes': (await aget_facets(spec))['sport_code'],
+        'query': spec.q,
+        'sport_filter': spec.sport_code,
     })
 
 @login_required
-def medals_list(request):
-    # Fetch medal types dynamically
-    medal_types = Medal.objects.values_list('medal_type', flat=True).distinct()
-
-    # Get filter values
-    medal_filter = request.GET.get('medal_type')
-    athlete_query = request.GET.get('athlete_name')
-    country_query = request.GET.get('country')
-
-    # Base queryset
-    medals = Medal.objects.select_related('athlete', 'event')
-
-    # Filter by medal type
-    if medal_filter:
-        medals = medals.filter(medal_type=medal_filter)
-
-    # Search by athlete name
-    if athlete_query:
-        medals = medals.filter(athlete__name__icontains=athlete_query)
-
-    # Search by country
-    if country_query:
-        medals = medals.filter(country__icontains=country_query)
+async def medals_list(request):
+    spec = MedalFilter.from_params(request.GET)
+    page = await apaginate(request, spec.list_queryset(), spec)
 
+    facets = await aget_facets(spec)
     context = {
-        'medals': medals,
-        'medal_types': medal_types,
-        'medal_filter': medal_filter,
-        'athlete_query': athlete_query,
-        'country_query': country_query,
+        'medals': page,
+        'page': page,
+        'medal_types': facets['medal_type'],
+        'medal_filter': spec.medal_type,
+        'athlete_query': spec.athlete_name,
+        'countries': facets['country'],
+        'country_query': spec.country,
     }
-    return render(request, 'medals.html', context)
+    return await arender(request, 'medals.html', context)
    
-import matplotlib.pyplot as plt
-from django.http import HttpResponse
-from django.db.models import Count
-from .models import Athlete, Event, Medal
-import io
-import matplotlib
-matplotlib.use('Agg')  # Non-GUI backend
-  
-@login_required   
-def athletes_by_country_graph(request):
-    # Get the top 10 countries by the number of athletes
-    data = Athlete.objects.values('country').annotate(count=Count('id')).order_by('-count')[:10]
-    countries = [item['country'] for item in data]
-    counts = [item['count'] for item in data]
- 
-    # Create the bar chart with countries on the x-axis
-    plt.figure(figsize=(10, 6))
-    plt.bar(countries, counts, color='gold')
-    plt.xlabel('Country')
-    plt.ylabel('Number of Athletes')
-    plt.title('Top 10 Countries by Number of Athletes')
-    plt.xticks(rotation=45, ha='right')  # Rotate x-axis labels for better visibility
-    plt.tight_layout()
-
-    # Save the figure to a buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-
-    # Return the image as HTTP response
-    return HttpResponse(buf, content_type='image/png')
-
 @login_required
-def athletes_visualization(request):
-    data = Athlete.objects.values('country').annotate(count=Count('id')).order_by('-count')
-    countries = [item['country'] for item in data]
-    counts = [item['count'] for item in data]
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(countries, counts, color='gold')
-    plt.xticks(rotation=45, ha='right')
-    plt.xlabel('Country')
-    plt.ylabel('Number of Athletes')
-    plt.title('Number of Athletes by Country')
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-
-    return HttpResponse(buf, content_type='image/png')
-
-# View for Events Visualization
+async def medal_standings(request):
+    params = standings_params(request.GET)
+    context = {
+        # Cached; a miss runs the aggregate in the sync thread
+        'standings': await sync_to_async(get_standings)(params),
+        'disciplines': await sync_to_async(get_disciplines)(),
+        'discipline_filter': params.get('discipline', ''),
+        'date_from': params.get('date_from', ''),
+        'date_to': params.get('date_to', ''),
+        'querystring': urlencode(params),
+    }
+    return await arender(request, 'standings.html', context)
 
 @login_required
-def events_visualization(request):
-    # Get the top 10 sports by the number of events
-    data = Event.objects.values('sport').annotate(count=Count('id')).order_by('-count')[:10]
-    sports = [item['sport'] for item in data]
-    counts = [item['count'] for item in data]
-
-    # Create the pie chart
-    plt.figure(figsize=(10, 6))
-    wedges, _, autotexts = plt.pie(
-        counts,
-        labels=None,  # Don't label the pie directly
-        autopct='%1.1f%%',
-        startangle=140,
-        colors=plt.cm.tab20.colors[:len(counts)]  # Use consistent color palette
-    )
-  
-    # Add legend on the top right
-    plt.legend(
-        wedges, sports,
-        title="Sports",
-        loc="upper right",
-        bbox_to_anchor=(1.3, 1),  # Adjust position of legend
-        frameon=False  # Optional: remove legend box border
-    )
-
-    # Add title
-    plt.title('Percentage of Events by Sport (Top 10)')
-    plt.tight_layout()
+async def medal_standings_json(request):
+    params = standings_params(request.GET)
+    return JsonResponse({'filters': params, 'standings': await sync_to_async(get_standings)(params)})
 
-    # Save the figure to a buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
+@login_required
+async def medal_timeline(request):
+    top = timeline_top(request.GET)
+    context = {
+        'top': top,
+        'top_choices': [5, 10, 15, 20, TIMELINE_MAX_TOP],
+    }
+    return await arender(request, 'timeline.html', context)
 
-    # Return the image as HTTP response
-    return HttpResponse(buf, content_type='image/png')
+@login_required
+async def medal_timeline_json(request):
+    # Cached per top-N; a miss reads the stored running totals in the sync thread
+    return JsonResponse(await sync_to_async(get_timeline)(timeline_top(request.GET)))
 
 @login_required
-def medals_visualization(request):
-    data = Medal.objects.values('country').annotate(count=Count('id')).order_by('-count')
-    countries = [item['country'] for item in data]
-    counts = [item['count'] for item in data]
+async def medal_timeline_graph(request):
+    return await atimeline_chart_response(request, timeline_top(request.GET))
 
-    plt.figure(figsize=(10, 6))
-    plt.bar(countries, counts, color='gold')
-    plt.xticks(rotation=45, ha='right')
-    plt.xlabel('Country')
-    plt.ylabel('Number of Medals')
-    plt.title('Number of Medals by Country')
-    plt.tight_layout()
+@login_required
+async def athletes_by_country_graph(request):
+    # Top 10 countries by the number of athletes
+    return await achart_response(request, 'athletes_top_countries')
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
+@login_required
+async def athletes_visualization(request):
+    return await achart_response(request, 'athletes_by_country')
 
-    return HttpResponse(buf, content_type='image/png')
+async def physique_sport(request):
+    # Only known disciplines, so made-up ?sport= values can't each compute and cache a chart
+    sport = request.GET.get('sport', '')
+    if sport and not await Discipline.objects.filter(name=sport).aexists():
+        raise Http404("No such sport.")
+    return sport
 
+@login_required
+async def athletes_physique_graph(request):
+    # Height, weight and BMI histograms of one sport (?sport=), or of every athlete
+    return await aphysique_chart_response(request, await physique_sport(request))
 
 @login_required
-def export_athletes_csv(request):
-    # Get filters from GET parameters
-    query = request.GET.get('q', '')
-    sport_filter = request.GET.get('sport', '')
+async def athletes_physique_json(request):
+    sport = await physique_sport(request)
+    return JsonResponse(await sync_to_async(get_physique)(sport))
 
-    # Base queryset
-    athletes = Athlete.objects.all()
+# View for Events Visualization
 
-    # Apply filters
-    if query:
-        athletes = athletes.filter(Q(name__icontains=query) | Q(country__icontains=query))
-    if sport_filter:
-        athletes = athletes.filter(sport__icontains=sport_filter)
+@login_required
+async def events_visualization(request):
+    # Top 10 sports by the number of events
+    return await achart_response(request, 'events_by_sport')
 
-    # Create the HttpResponse object with the appropriate CSV header
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="filtered_athletes.csv"'
+@login_required
+async def medals_visualization(request):
+    return await achart_response(request, 'medals_by_country')
 
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'Country', 'Sport', 'Height', 'Weight'])  # Headers
 
-    # Write data
-    for athlete in athletes:
-        writer.writerow([athlete.name, athlete.country, athlete.sport, athlete.height, athlete.weight])
+@login_required
+async def export_athletes_csv(request):
+    spec = AthleteFilter.from_params(request.GET)
 
-    return response
+    # Stream the rows straight from the cursor instead of loading every athlete
+    rows = export_rows(request, spec, 'name', 'country', 'sport', 'height', 'weight')
+    return stream_csv(request, 'filtered_athletes.csv', ['Name', 'Country', 'Sport', 'Height', 'Weight'], rows)
 
 @login_required
 def export_athletes_pdf(request):
-    # Get filters from GET parameters
-    query = request.GET.get('q', '')
-    sport_filter = request.GET.get('sport', '')
-
-    # Base queryset
-    athletes = Athlete.objects.all()
-
-    # Apply filters
-    if query:
-        athletes = athletes.filter(Q(name__icontains=query) | Q(country__icontains=query))
-    if sport_filter:
-        athletes = athletes.filter(sport__icontains=sport_filter)
-
-    # Define title, headings, and data for the template
-    title = "Filtered Athletes List"
-    headings = ["Name", "Country", "Sport", "Height", "Weight"]
-    data = [[athlete.name, athlete.country, athlete.sport, athlete.height, athlete.weight] for athlete in athletes]
-
-    # Render and generate PDF
-    template = get_template('export_pdf.html')
-    html = template.render({'title': title, 'headings': headings, 'data': data})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="filtered_athletes.pdf"'
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse('We had some errors with generating your PDF.')
-    return response
+    # PDFs are rendered by a background job; see export_job_status
+    return _start_pdf_export(request, 'athletes')
 
 @login_required
-def export_events_csv(request):
-    # Get filters from GET parameters
-    query = request.GET.get('q', '')
-    sport_code_filter = request.GET.get('sport_code', '')
+async def export_events_csv(request):
+    spec = EventFilter.from_params(request.GET)
+    rows = export_rows(request, spec, 'name', 'sport', 'sport_code')
+    return stream_csv(request, 'filtered_events.csv', ['Event Name', 'Sport', 'Sport Code'], rows)
 
-    # Base queryset
-    events = Event.objects.all()
+@login_required
+def export_events_pdf(request):
+    # PDFs are rendered by a background job; see export_job_status
+    return _start_pdf_export(request, 'events')
+@login_required
+async def export_medals_csv(request):
+    spec = MedalFilter.from_params(request.GET)
 
-    # Apply filters
-    if query:
-        events = events.filter(Q(name__icontains=query) | Q(sport__icontains=query))
-    if sport_code_filter:
-        events = events.filter(sport_code__icontains=sport_code_filter)
+    # Only the four exported columns are selected, joined in the same query
+    rows = export_rows(
+        request, spec, 'athlete__name', 'country', 'event__name', 'medal_type',
+        transform=lambda row: (row[0] or "N/A", row[1], row[2] or "N/A", row[3]),
+    )
+    return stream_csv(request, 'filtered_medals.csv', ['Athlete', 'Country', 'Event', 'Medal Type'], rows)
+@login_required
+def export_medals_pdf(request):
+    # PDFs are rendered by a background job; see export_job_status
+    return _start_pdf_export(request, 'medals')
 
-    # Create the HttpResponse object with the appropriate CSV header
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="filtered_events.csv"'
 
-    writer = csv.writer(response)
-    writer.writerow(['Event Name', 'Sport', 'Sport Code'])  # Headers
+def _wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
 
-    # Write data
-    for event in events:
-        writer.writerow([event.name, event.sport, event.sport_code])
+def _job_payload(request, job):
+    payload = {
+        'id': str(job.id),
+        'report': job.report,
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('export_job_status', args=[job.id])),
+        'download_url': None,
+        'error': job.error or None,
+    }
+    if job.status == ExportJob.DONE:
+        payload['download_url'] = request.build_absolute_uri(reverse('export_job_download', args=[job.id]))
+    return payload
 
-    return response
+def _start_pdf_export(request, report):
+    # Reuses a finished or in-flight job when the same filters were exported before
+    job = submit_export(report, FILTERS[report].from_params(request.GET))
+    if _wants_json(request):
+        return JsonResponse(_job_payload(request, job), status=200 if job.status == ExportJob.DONE else 202)
+    return redirect('export_job_status', job_id=job.id)
 
 @login_required
-def export_events_pdf(request):
-    # Get filters from GET parameters
-    query = request.GET.get('q', '')
-    sport_code_filter = request.GET.get('sport_code', '')
-
-    # Base queryset
-    events = Event.objects.all()
-
-    # Apply filters
-    if query:
-        events = events.filter(Q(name__icontains=query) | Q(sport__icontains=query))
-    if sport_code_filter:
-        events = events.filter(sport_code__icontains=sport_code_filter)
-
-    # Define title, headings, and data for the template
-    title = "Filtered Events List"
-    headings = ["Event Name", "Sport", "Sport Code"]
-    data = [[event.name, event.sport, event.sport_code] for event in events]
-
-    # Render and generate PDF
-    template = get_template('export_pdf.html')
-    html = template.render({'title': title, 'headings': headings, 'data': data})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="filtered_events.pdf"'
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse('We had some errors with generating your PDF.')
-    return response
-@login_required
-def export_medals_csv(request):
-    # Get filters from GET parameters
-    medal_filter = request.GET.get('medal_type', '')
-    athlete_query = request.GET.get('athlete_name', '')
-    country_query = request.GET.get('country', '')
-
-    # Base queryset
-    medals = Medal.objects.select_related('athlete', 'event').all()
-
-    # Apply filters
-    if medal_filter:
-        medals = medals.filter(medal_type__icontains=medal_filter)
-    if athlete_query:
-        medals = medals.filter(athlete__name__icontains=athlete_query)
-    if country_query:
-        medals = medals.filter(country__icontains=country_query)
-
-    # Create the HttpResponse object with the appropriate CSV header
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="filtered_medals.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Athlete', 'Country', 'Event', 'Medal Type'])  # Headers
-
-    # Write data
-    for medal in medals:
-        writer.writerow([
-            medal.athlete.name if medal.athlete else "N/A",
-            medal.country,
-            medal.event.name if medal.event else "N/A",
-            medal.medal_type
-        ])
-
-    return response
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    if _wants_json(request):
+        return JsonResponse(_job_payload(request, job))
+    return render(request, 'export_job.html', {'job': job})
+
 @login_required
-def export_medals_pdf(request):
-    # Get filters from GET parameters
-    medal_filter = request.GET.get('medal_type', '')
-    athlete_query = request.GET.get('athlete_name', '')
-    country_query = request.GET.get('country', '')
-
-    # Base queryset
-    medals = Medal.objects.select_related('athlete', 'event').all()
-
-    # Apply filters
-    if medal_filter:
-        medals = medals.filter(medal_type__icontains=medal_filter)
-    if athlete_query:
-        medals = medals.filter(athlete__name__icontains=athlete_query)
-    if country_query:
-        medals = medals.filter(country__icontains=country_query)
-
-    # Define title, headings, and data for the template
-    title = "Filtered Medals List"
-    headings = ["Athlete", "Country", "Event", "Medal Type"]
-    data = [[
-        medal.athlete.name if medal.athlete else "N/A",
-        medal.country,
-        medal.event.name if medal.event else "N/A",
-        medal.medal_type
-    ] for medal in medals]
-
-    # Render and generate PDF
-    template = get_template('export_pdf.html')
-    html = template.render({'title': title, 'headings': headings, 'data': data})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="filtered_medals.pdf"'
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse('We had some errors with generating your PDF.')
-    return response
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, status=ExportJob.DONE)
+    path = job_path(job)
+    if not os.path.exists(path):
+        raise Http404("This export is no longer available.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"filtered_{job.report}.pdf")
@@ -0,0 +1,45 @@
+"""Process pools for PDF export jobs and parallel PDF rendering.
+
+Workers are started with "forkserver" (or "spawn" where that is missing)
+rather than forked from a web worker, which would copy its open database
+connections, held locks and server threads into every child. They begin
+from a fresh interpreter, so this module must not import models: its
+initializer runs before Django is set up.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections
+
+START_METHOD = getattr(
+    settings, 'WORKER_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn',
+)
+
+
+def _init_django(setting_values, database_names):
+    # Apply the parent's values before anything reads them, then open the databases it has open
+    for name, value in setting_values.items():
+        setattr(settings, name, value)
+    django.setup()
+    for alias, name in database_names.items():
+        connections[alias].settings_dict['NAME'] = name
+
+
+def process_pool(max_workers, django_settings=None):
+    """A ProcessPoolExecutor whose workers start clean.
+
+    Pass `django_settings` ({name: value}) for workers that use the ORM:
+    they set Django up with those values and the database files this
+    process uses, which a test or benchmark may have swapped in at runtime.
+    """
+    context = multiprocessing.get_context(START_METHOD)
+    if django_settings is None:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    database_names = {alias: connections[alias].settings_dict['NAME'] for alias in connections}
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context,
+        initializer=_init_django, initargs=(django_settings, database_names),
+    )
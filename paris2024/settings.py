@@ -26,6 +26,8 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    # First, so its timings and query counts cover every other middleware too
+    'olympics.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,7 +43,8 @@ ROOT_URLCONF = 'paris2024.urls'
 # Templates
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The stock Django backend, plus render timing for olympics.perf
+        'BACKEND': 'olympics.perf.TimedDjangoTemplates',
         'DIRS': [],  # Keep this empty for now
         'APP_DIRS': True,  # Ensures app-level templates work
         'OPTIONS': {
@@ -66,6 +69,49 @@ DATABASES = {
     }
 }
 
+# Production Database Profile
+# Set OLYMPICS_DB_PROFILE=production to tune SQLite for concurrent traffic:
+# - WAL lets readers run alongside a writer instead of queueing behind it
+# - synchronous=NORMAL is safe with WAL and skips an fsync per commit
+# - mmap_size and cache_size (in KiB when negative) keep hot pages in memory
+# The read-only replica takes only the read PRAGMAs: switching the journal mode is a
+# write, which fails on a mode=ro connection if the file is not in WAL mode yet
+SQLITE_READ_INIT_COMMAND = 'PRAGMA mmap_size=268435456; PRAGMA cache_size=-65536; PRAGMA temp_store=MEMORY'
+SQLITE_INIT_COMMAND = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; ' + SQLITE_READ_INIT_COMMAND
+DATABASE_PROFILE = os.environ.get('OLYMPICS_DB_PROFILE', 'development')
+
+if DATABASE_PROFILE == 'production':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Reuse connections across requests (WSGI workers and commands; under ASGI
+            # each request has its own connection context, so this mostly helps WSGI)
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': SQLITE_INIT_COMMAND,
+                # Seconds a writer waits for the lock instead of failing with "database is locked"
+                'timeout': 20,
+                # Take the write lock at BEGIN, so two writers cannot deadlock upgrading a read lock
+                'transaction_mode': 'IMMEDIATE',
+            },
+        },
+        # The same file opened read-only (mode=ro); olympics.routers sends dashboard reads here
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': SQLITE_READ_INIT_COMMAND,
+                'timeout': 20,
+            },
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    DATABASE_ROUTERS = ['olympics.routers.ReadReplicaRouter']
+
 # Password Validators
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -102,3 +148,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'  # URL for login page
 LOGIN_REDIRECT_URL = '/'  # Redirect to home page after login
 LOGOUT_REDIRECT_URL = '/login/'  # Redirect to login page after logout
+
+# Sessions and User Lookups
+# Signed cookies keep session reads and writes out of db.sqlite3. 'cached_db' is the
+# alternative once CACHES points at a cache shared by every worker; with the default
+# per-process cache a logged-out session could live on in the other workers.
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+# The logged-in user is read from the cache instead of auth_user on each request
+AUTHENTICATION_BACKENDS = ['olympics.auth.CachedModelBackend']
+# Seconds a cached user can lag behind changes made in another process
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Data Import
+# Rows per bulk INSERT when loading the CSV files (manage.py import_olympics)
+IMPORT_BATCH_SIZE = 1000
+
+# Pagination
+# Cards per list page (a multiple of 2 and 3 so the card grids fill evenly)
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 96
+
+# Filter Facets
+# Dropdown values and their counts are cached per filter set and data version;
+# this many results are also kept in each process in front of the cache
+FACET_LRU_SIZE = 256
+
+# Athlete Search
+# 'icontains' scans the table with LIKE; 'fts5' uses the SQLite full-text index
+# built by `python manage.py search_index` (word-prefix matching)
+ATHLETE_SEARCH_BACKEND = 'icontains'
+
+# Chart Cache
+# Rendered chart PNGs are stored here (and in the default cache), named by
+# chart and data version; `python manage.py warm_charts` fills it ahead of time
+CHART_CACHE_DIR = os.path.join(BASE_DIR, 'chart_cache')
+# Threads drawing charts for the async chart views, off the event loop
+CHART_RENDER_WORKERS = 2
+
+# Exports
+# Rows fetched per database round trip while streaming CSV exports
+EXPORT_CHUNK_SIZE = 2000
+
+# PDF Export Jobs
+# Finished PDFs are written here and reused for identical filters until the data changes
+EXPORT_ROOT = os.path.join(BASE_DIR, 'exports')
+# Jobs older than this are deleted, with any PDF no remaining job points at
+EXPORT_RETENTION_HOURS = 24
+# Worker processes rendering PDFs in the background (0 renders inside the request)
+PDF_EXPORT_WORKERS = 2
+# 'reportlab' draws export tables directly (chunks laid out in parallel);
+# 'xhtml2pdf' converts templates/export_pdf.html and is also the fallback
+PDF_EXPORT_ENGINE = 'reportlab'
+# Processes laying out chunks of a large PDF table, and pages per chunk
+PDF_RENDER_PROCESSES = min(4, os.cpu_count() or 1)
+PDF_CHUNK_PAGES = 40
+
+# Performance Instrumentation
+# olympics.perf.PerfMiddleware records every request; staff can read per-view
+# percentiles at /_perf/. Remove the middleware to turn recording off.
+PERF_BUFFER_SIZE = 1000
+# Append each request record to this JSON-lines file (None to keep them in memory only)
+PERF_LOG_FILE = None
+# Flag a request running the same SQL shape more than this many times
+PERF_N_PLUS_ONE_THRESHOLD = 5